@@ -19,6 +19,19 @@ function ServiceDetail() {
       .catch(() => setLoading(false));
   }, [id]);
 
+  // Refresh when this service or its reviews change instead of polling
+  useEffect(() => {
+    const source = new EventSource(`/api/events?service_provider_id=${id}`);
+    const refresh = () => {
+      fetch(`/api/service-providers/${id}`)
+        .then(res => res.json())
+        .then(data => setService(data));
+    };
+    ['review.created', 'review.updated', 'review.deleted', 'service_provider.updated', 'reset']
+      .forEach(type => source.addEventListener(type, refresh));
+    return () => source.close();
+  }, [id]);
+
   if (loading) return <div className="loading">Chargement...</div>;
   if (!service) return <div className="error">Service non trouvé</div>;
 
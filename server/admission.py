@@ -0,0 +1,237 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, g, make_response, jsonify
+
+
+# Endpoints whose GET returns a whole (possibly searched) collection
+EXPENSIVE_ENDPOINTS = {'users', 'serviceproviders', 'reviews'}
+
+# Endpoints streaming a whole table, for minutes on large tables
+EXPORT_ENDPOINTS = {'export'}
+
+PRIORITY_CATEGORY = 'Emergency Services'
+
+
+class TokenBucket:
+    """Classic token bucket refilled lazily on each take"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now, cost=1):
+        """Return 0 when admitted, otherwise the seconds until enough tokens exist"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per client and per endpoint class token buckets, LRU bounded"""
+
+    def __init__(self, limits, max_buckets=10000):
+        # limits: {endpoint_class: (tokens_per_second, burst)}
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def allow(self, client, endpoint_class):
+        limit = self.limits.get(endpoint_class)
+        if not limit:
+            return 0
+        rate, burst = limit
+        key = (client, endpoint_class)
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst, now)
+                self.buckets[key] = bucket
+                if len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+class ConcurrencyLimiter:
+    """Bounded concurrency with a bounded wait queue and latency based shedding.
+
+    Priority requests may use `reserved` extra slots, are never shed for
+    latency and are woken before ordinary waiters.
+    """
+
+    def __init__(self, max_active, max_queue, queue_timeout, latency_threshold, reserved=2):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_threshold = latency_threshold
+        self.reserved = reserved
+        self.active = 0
+        self.waiting = 0
+        self.priority_waiting = 0
+        self.latency_ewma = 0.0
+        self.cond = threading.Condition()
+
+    def _has_slot(self, priority):
+        if priority:
+            return self.active < self.max_active + self.reserved
+        return self.active < self.max_active and not self.priority_waiting
+
+    def acquire(self, priority=False):
+        """Return True once a slot is held, False if the request should be shed"""
+        with self.cond:
+            if self._has_slot(priority):
+                self.active += 1
+                return True
+            if not priority:
+                if self.waiting >= self.max_queue:
+                    return False
+                if self.latency_ewma > self.latency_threshold:
+                    return False
+            self.waiting += 1
+            if priority:
+                self.priority_waiting += 1
+            try:
+                admitted = self.cond.wait_for(lambda: self._has_slot(priority), self.queue_timeout)
+            finally:
+                self.waiting -= 1
+                if priority:
+                    self.priority_waiting -= 1
+            if admitted:
+                self.active += 1
+            return admitted
+
+    def release(self, elapsed):
+        with self.cond:
+            self.active -= 1
+            self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * elapsed
+            self.cond.notify_all()
+
+
+class AdmissionControl:
+    """Flask extension rate limiting every request and shedding expensive reads"""
+
+    def __init__(self, app=None):
+        self.counters = {}
+        self.counters_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ADMISSION_ENABLED', True)
+        app.config.setdefault('ADMISSION_RATE_LIMITS', {
+            'write': (1.0, 10),
+            'search': (5.0, 20),
+            'read': (20.0, 50),
+            'export': (0.1, 3),
+        })
+        app.config.setdefault('ADMISSION_MAX_ACTIVE', 8)
+        app.config.setdefault('ADMISSION_MAX_QUEUE', 16)
+        app.config.setdefault('ADMISSION_QUEUE_TIMEOUT', 2.0)
+        app.config.setdefault('ADMISSION_LATENCY_THRESHOLD', 1.0)
+        app.config.setdefault('ADMISSION_RESERVED_SLOTS', 2)
+        app.config.setdefault('ADMISSION_MAX_EXPORTS', 2)
+
+        self.rate_limiter = RateLimiter(app.config['ADMISSION_RATE_LIMITS'])
+        self.limiter = ConcurrencyLimiter(
+            app.config['ADMISSION_MAX_ACTIVE'],
+            app.config['ADMISSION_MAX_QUEUE'],
+            app.config['ADMISSION_QUEUE_TIMEOUT'],
+            app.config['ADMISSION_LATENCY_THRESHOLD'],
+            app.config['ADMISSION_RESERVED_SLOTS'],
+        )
+        # Exports hold their slot for the whole stream: no queue, and their
+        # duration must not count toward the search latency average
+        self.export_limiter = ConcurrencyLimiter(
+            app.config['ADMISSION_MAX_EXPORTS'], 0, 0, math.inf, reserved=0,
+        )
+        self.enabled = app.config['ADMISSION_ENABLED']
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def count(self, name):
+        with self.counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def stats(self):
+        with self.counters_lock:
+            counters = dict(self.counters)
+        return {
+            'counters': counters,
+            'active': self.limiter.active,
+            'waiting': self.limiter.waiting,
+            'exports_active': self.export_limiter.active,
+            'latency_ewma_ms': round(self.limiter.latency_ewma * 1000, 2),
+        }
+
+    @staticmethod
+    def classify():
+        if request.method in ('POST', 'PATCH', 'PUT', 'DELETE'):
+            return 'write'
+        if request.endpoint in EXPENSIVE_ENDPOINTS:
+            return 'search'
+        if request.endpoint in EXPORT_ENDPOINTS:
+            return 'export'
+        return 'read'
+
+    @staticmethod
+    def reject(status, message, retry_after):
+        response = make_response(jsonify({"error": message}), status)
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def before_request(self):
+        if not self.enabled or request.endpoint is None:
+            return None
+
+        endpoint_class = self.classify()
+        retry_after = self.rate_limiter.allow(request.remote_addr, endpoint_class)
+        if retry_after:
+            self.count(f'rate_limited.{endpoint_class}')
+            return self.reject(429, "Too many requests", retry_after)
+
+        if endpoint_class == 'search':
+            priority = request.args.get('category') == PRIORITY_CATEGORY
+            if not self.limiter.acquire(priority):
+                self.count('shed')
+                return self.reject(503, "Server is busy, please retry", self.limiter.queue_timeout)
+            g.admission_started = time.monotonic()
+            if priority:
+                self.count('admitted.priority')
+        elif endpoint_class == 'export':
+            if not self.export_limiter.acquire():
+                self.count('shed.export')
+                return self.reject(503, "Too many exports running, please retry later", 60)
+            g.admission_export_started = time.monotonic()
+
+        self.count(f'admitted.{endpoint_class}')
+        return None
+
+    def after_request(self, response):
+        started = g.pop('admission_export_started', None)
+        if started is not None:
+            # The request context ends before a streamed body is sent:
+            # hold the export slot until the server closes the response
+            response.call_on_close(lambda: self.export_limiter.release(time.monotonic() - started))
+        return response
+
+    def teardown_request(self, exc):
+        started = g.pop('admission_started', None)
+        if started is not None:
+            self.limiter.release(time.monotonic() - started)
+        # Still set only when the view raised and after_request was skipped
+        started = g.pop('admission_export_started', None)
+        if started is not None:
+            self.export_limiter.release(time.monotonic() - started)
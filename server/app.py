@@ -1,20 +1,44 @@
 #!/usr/bin/env python3
 
 # Standard library imports
+from datetime import datetime
+from zoneinfo import ZoneInfo
 
 # Remote library imports
-from flask import request, make_response, jsonify
+from flask import request, make_response, jsonify, Response, stream_with_context
 from flask_restful import Resource
+from sqlalchemy.exc import OperationalError
 
 # Local imports
-from config import app, db, api
-from models import User, ServiceProvider, Review
+from config import app, db, api, admission, events
+from models import (
+    User, ServiceProvider, ServiceHours, Review, SimilarProvider, UserRecommendation, IdempotencyKey, EventLog,
+    provider_filters, plain_row,
+)
+from export import EXPORT_MODELS, EXPORT_FORMATS, export_stream
+from client_build import serve_index
+from idempotency import Idempotency
+from sharding import ShardRouter
+from readmodel import ProviderReadModel
+from validation import USER_SCHEMA, SERVICE_PROVIDER_SCHEMA, REVIEW_SCHEMA, ValidationError
+
+# Share server-sent events between worker processes through the event_log table
+events.init_app(app, db, EventLog)
+
+# Regional shards for provider and review reads (off unless SHARD_URL_TEMPLATE is set)
+shards = ShardRouter(app, events)
+
+# In-memory provider listings (off unless READ_MODEL_ENABLED is set)
+read_model = ProviderReadModel(app, events)
+
+# Replay POST responses for repeated Idempotency-Key headers
+idempotency = Idempotency(app, db, IdempotencyKey)
 
 # Views go here!
 
 @app.route('/')
 def index():
-    return '<h1>Konekte - Community Resource Hub API</h1>'
+    return serve_index() or '<h1>Konekte - Community Resource Hub API</h1>'
 
 
 # User Routes
@@ -28,10 +52,11 @@ class Users(Resource):
     
     def post(self):
         try:
-            data = request.get_json()
+            # Rejects bad payloads before any model or session work
+            data = USER_SCHEMA.validate(request.get_json())
             new_user = User(
-                name=data.get('name'),
-                email=data.get('email')
+                name=data['name'],
+                email=data['email']
             )
             db.session.add(new_user)
             db.session.commit()
@@ -39,8 +64,13 @@ class Users(Resource):
                 jsonify(new_user.to_dict(rules=('-service_providers', '-reviews'))),
                 201
             )
+        except ValidationError as e:
+            return make_response(jsonify({"error": str(e), "errors": e.errors}), 400)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
+        except OperationalError:
+            # Transient (e.g. database is locked): a 5xx is not replayed for the Idempotency-Key
+            return make_response(jsonify({"error": "Failed to create user, please retry"}), 503)
         except Exception as e:
             return make_response(jsonify({"error": "Failed to create user"}), 400)
 
@@ -53,32 +83,133 @@ class UserByID(Resource):
         return make_response(jsonify(user.to_dict()), 200)
 
 
+class UserSummary(Resource):
+    def get(self, id):
+        # One round trip: review and service aggregates joined onto the user row
+        reviews = (
+            db.select(
+                Review.user_id,
+                db.func.count().label('review_count'),
+                db.func.avg(Review.rating).label('average_rating'),
+                db.func.max(Review.created_at).label('last_review_at')
+            )
+            .where(Review.user_id == id)
+            .group_by(Review.user_id)
+            .subquery()
+        )
+        services = (
+            db.select(
+                ServiceProvider.user_id,
+                db.func.count().label('service_count'),
+                db.func.max(ServiceProvider.created_at).label('last_service_at')
+            )
+            .where(ServiceProvider.user_id == id, ServiceProvider.archived_at.is_(None))
+            .group_by(ServiceProvider.user_id)
+            .subquery()
+        )
+        row = db.session.execute(
+            db.select(User.id, User.name, reviews, services)
+            .outerjoin(reviews, reviews.c.user_id == User.id)
+            .outerjoin(services, services.c.user_id == User.id)
+            .where(User.id == id)
+        ).mappings().first()
+        if not row:
+            return make_response(jsonify({"error": "User not found"}), 404)
+        
+        last_review_at, last_service_at = row['last_review_at'], row['last_service_at']
+        return make_response(jsonify({
+            'id': row['id'],
+            'name': row['name'],
+            'review_count': row['review_count'] or 0,
+            'average_rating': round(row['average_rating'], 2) if row['average_rating'] is not None else None,
+            'service_count': row['service_count'] or 0,
+            'last_review_at': last_review_at.strftime(Review.datetime_format) if last_review_at else None,
+            'last_service_at': last_service_at.strftime(ServiceProvider.datetime_format) if last_service_at else None,
+        }), 200)
+
+
+def user_page(model, user_id, *conditions):
+    """A user's rows of model, newest first, one page at a time (?limit=, ?before=<id>)"""
+    if not db.session.get(User, user_id):
+        return make_response(jsonify({"error": "User not found"}), 404)
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    before = request.args.get('before', type=int)
+    table = model.__table__
+    statement = db.select(table).where(table.c.user_id == user_id, *conditions)
+    if before:
+        # Keyset pagination: walks the user_id index, however deep the page
+        statement = statement.where(table.c.id < before)
+    rows = db.session.execute(statement.order_by(table.c.id.desc()).limit(limit)).mappings()
+    return make_response(jsonify([plain_row(model, row) for row in rows]), 200)
+
+
+class UserReviews(Resource):
+    def get(self, id):
+        return user_page(Review, id)
+
+
+class UserServices(Resource):
+    def get(self, id):
+        return user_page(ServiceProvider, id, ServiceProvider.archived_at.is_(None))
+
+
+class UserRecommendations(Resource):
+    def get(self, id):
+        user = User.query.filter_by(id=id).first()
+        if not user:
+            return make_response(jsonify({"error": "User not found"}), 404)
+        
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        rows = db.session.execute(
+            db.select(ServiceProvider, UserRecommendation.score)
+            .join(UserRecommendation, UserRecommendation.service_provider_id == ServiceProvider.id)
+            .where(UserRecommendation.user_id == id, ServiceProvider.archived_at.is_(None))
+            .order_by(UserRecommendation.rank)
+            .limit(limit)
+        ).all()
+        
+        return make_response(
+            jsonify([dict(service.to_dict(), score=score) for service, score in rows]),
+            200
+        )
+
+
 # ServiceProvider Routes
 class ServiceProviders(Resource):
     def get(self):
         # Get query parameters for filtering
         category = request.args.get('category')
         search = request.args.get('search')
+        region = request.args.get('region')
+        open_at = request.args.get('open_at')
+        open_now = request.args.get('open_now')
         
-        # Start with base query
-        query = ServiceProvider.query
+        moment = None
+        if open_now == '1' or open_at:
+            local_tz = ZoneInfo(app.config['LOCAL_TIMEZONE'])
+            try:
+                moment = datetime.fromisoformat(open_at) if open_at else datetime.now(local_tz)
+            except ValueError:
+                return make_response(jsonify({"error": "open_at must be an ISO 8601 datetime"}), 400)
+            if moment.tzinfo:
+                moment = moment.astimezone(local_tz)
         
-        # Apply filters if provided
-        if category:
-            query = query.filter_by(category=category)
-        
-        if search:
-            # Search in name, description, or location
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    ServiceProvider.name.ilike(search_term),
-                    ServiceProvider.description.ilike(search_term),
-                    ServiceProvider.location.ilike(search_term)
-                )
+        # Without an hours filter the in-memory read model answers on its own
+        if read_model.enabled and moment is None:
+            return Response(
+                read_model.current().listing(category=category, search=search, region=region),
+                mimetype='application/json'
             )
         
-        services = query.all()
+        # Apply filters if provided; with regional shards a region touches one shard
+        filters = dict(category=category, search=search, region=region, moment=moment)
+        if shards.enabled:
+            return make_response(jsonify(shards.service_providers(**filters)), 200)
+        
+        services = ServiceProvider.query.filter(
+            *provider_filters(ServiceProvider.__table__, ServiceHours.__table__, **filters)
+        ).all()
         
         return make_response(
             jsonify([service.to_dict(rules=('-user.service_providers', '-reviews.service_provider')) for service in services]),
@@ -87,31 +218,36 @@ class ServiceProviders(Resource):
     
     def post(self):
         try:
-            data = request.get_json()
+            data = SERVICE_PROVIDER_SCHEMA.validate(request.get_json())
             new_service = ServiceProvider(
-                name=data.get('name'),
-                category=data.get('category'),
-                description=data.get('description'),
-                location=data.get('location'),
-                phone=data.get('phone'),
-                hours=data.get('hours'),
-                user_id=data.get('user_id')
+                name=data['name'],
+                category=data['category'],
+                description=data['description'],
+                location=data['location'],
+                phone=data['phone'],
+                hours=data['hours'],
+                region=data['region'],
+                user_id=data['user_id']
             )
             db.session.add(new_service)
             db.session.commit()
-            return make_response(
-                jsonify(new_service.to_dict(rules=('-user.service_providers', '-reviews'))),
-                201
-            )
+            body = new_service.to_dict(rules=('-user.service_providers', '-reviews'))
+            events.publish('service_provider.created', body, new_service.id)
+            return make_response(jsonify(body), 201)
+        except ValidationError as e:
+            return make_response(jsonify({"error": str(e), "errors": e.errors}), 400)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
+        except OperationalError:
+            # Transient (e.g. database is locked): a 5xx is not replayed for the Idempotency-Key
+            return make_response(jsonify({"error": "Failed to create service provider, please retry"}), 503)
         except Exception as e:
             return make_response(jsonify({"error": "Failed to create service provider"}), 400)
 
 
 class ServiceProviderByID(Resource):
     def get(self, id):
-        service = ServiceProvider.query.filter_by(id=id).first()
+        service = ServiceProvider.query.filter_by(id=id, archived_at=None).first()
         if not service:
             return make_response(jsonify({"error": "Service provider not found"}), 404)
         return make_response(
@@ -126,26 +262,39 @@ class ServiceProviderByID(Resource):
         
         try:
             data = request.get_json()
+            fields = SERVICE_PROVIDER_SCHEMA.validate(data, partial=True)
             
             # Update only provided fields
-            if 'name' in data:
-                service.name = data['name']
-            if 'category' in data:
-                service.category = data['category']
-            if 'description' in data:
-                service.description = data['description']
-            if 'location' in data:
-                service.location = data['location']
-            if 'phone' in data:
-                service.phone = data['phone']
-            if 'hours' in data:
-                service.hours = data['hours']
+            if 'name' in fields:
+                service.name = fields['name']
+            if 'category' in fields:
+                service.category = fields['category']
+            if 'description' in fields:
+                service.description = fields['description']
+            if 'location' in fields:
+                service.location = fields['location']
+            if 'phone' in fields:
+                service.phone = fields['phone']
+            if 'hours' in fields:
+                service.hours = fields['hours']
+            if 'region' in fields:
+                service.region = fields['region']
+            if 'archived' in data:
+                service.archived_at = db.func.now() if data['archived'] else None
+            
+            # Text changed: drop the precomputed neighbors so the
+            # incremental similarity job recomputes them
+            if data.keys() & {'name', 'category', 'description', 'location'}:
+                SimilarProvider.query.filter_by(service_provider_id=id).delete()
             
             db.session.commit()
+            events.publish('service_provider.updated', service.to_dict(), service.id)
             return make_response(
                 jsonify(service.to_dict(rules=('-user.service_providers', '-reviews.service_provider'))),
                 200
             )
+        except ValidationError as e:
+            return make_response(jsonify({"error": str(e), "errors": e.errors}), 400)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
         except Exception as e:
@@ -157,23 +306,64 @@ class ServiceProviderByID(Resource):
             return make_response(jsonify({"error": "Service provider not found"}), 404)
         
         try:
+            # ?archive=1 hides the service but keeps it and its reviews
+            if request.args.get('archive') == '1':
+                service.archived_at = db.func.now()
+                db.session.commit()
+                events.publish('service_provider.archived', {'id': id}, id)
+                return make_response(jsonify({"message": "Service provider archived successfully"}), 200)
+
+            # Reviews are removed by the database's ON DELETE CASCADE
             db.session.delete(service)
             db.session.commit()
+            events.publish('service_provider.deleted', {'id': id}, id)
             return make_response(jsonify({"message": "Service provider deleted successfully"}), 200)
         except Exception as e:
             return make_response(jsonify({"error": "Failed to delete service provider"}), 400)
 
 
+class SimilarServiceProviders(Resource):
+    def get(self, id):
+        service = ServiceProvider.query.filter_by(id=id, archived_at=None).first()
+        if not service:
+            return make_response(jsonify({"error": "Service provider not found"}), 404)
+        
+        limit = max(1, min(request.args.get('limit', 5, type=int), 20))
+        rows = db.session.execute(
+            db.select(ServiceProvider, SimilarProvider.score)
+            .join(SimilarProvider, SimilarProvider.similar_id == ServiceProvider.id)
+            .where(SimilarProvider.service_provider_id == id, ServiceProvider.archived_at.is_(None))
+            .order_by(SimilarProvider.rank)
+            .limit(limit)
+        ).all()
+        
+        return make_response(
+            jsonify([dict(similar.to_dict(), score=score) for similar, score in rows]),
+            200
+        )
+
+
 # Review Routes
 class Reviews(Resource):
     def get(self):
-        # Optional: filter by service_provider_id
-        service_id = request.args.get('service_provider_id')
+        # Optional: filter by service_provider_id or by the provider's region
+        service_id = request.args.get('service_provider_id', type=int)
+        region = request.args.get('region')
         
+        if shards.enabled:
+            if service_id:
+                service = db.session.get(ServiceProvider, service_id)
+                if not service:
+                    return make_response(jsonify([]), 200)
+                region = service.region
+            return make_response(jsonify(shards.reviews_for(region, service_id)), 200)
+        
+        query = Review.query
         if service_id:
-            reviews = Review.query.filter_by(service_provider_id=service_id).all()
-        else:
-            reviews = Review.query.all()
+            query = query.filter_by(service_provider_id=service_id)
+        if region:
+            query = query.join(Review.service_provider).filter(ServiceProvider.region == region)
+        reviews = query.all()
         
         return make_response(
             jsonify([review.to_dict(rules=('-user.reviews', '-service_provider.reviews')) for review in reviews]),
@@ -182,21 +372,25 @@ class Reviews(Resource):
     
     def post(self):
         try:
-            data = request.get_json()
+            data = REVIEW_SCHEMA.validate(request.get_json())
             new_review = Review(
-                rating=data.get('rating'),
-                comment=data.get('comment'),
-                user_id=data.get('user_id'),
-                service_provider_id=data.get('service_provider_id')
+                rating=data['rating'],
+                comment=data['comment'],
+                user_id=data['user_id'],
+                service_provider_id=data['service_provider_id']
             )
             db.session.add(new_review)
             db.session.commit()
-            return make_response(
-                jsonify(new_review.to_dict(rules=('-user.reviews', '-service_provider.reviews'))),
-                201
-            )
+            body = new_review.to_dict(rules=('-user.reviews', '-service_provider.reviews'))
+            events.publish('review.created', body, new_review.service_provider_id)
+            return make_response(jsonify(body), 201)
+        except ValidationError as e:
+            return make_response(jsonify({"error": str(e), "errors": e.errors}), 400)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
+        except OperationalError:
+            # Transient (e.g. database is locked): a 5xx is not replayed for the Idempotency-Key
+            return make_response(jsonify({"error": "Failed to create review, please retry"}), 503)
         except Exception as e:
             return make_response(jsonify({"error": "Failed to create review"}), 400)
 
@@ -217,19 +411,20 @@ class ReviewByID(Resource):
             return make_response(jsonify({"error": "Review not found"}), 404)
         
         try:
-            data = request.get_json()
+            fields = REVIEW_SCHEMA.validate(request.get_json(), partial=True)
             
             # Update only provided fields
-            if 'rating' in data:
-                review.rating = data['rating']
-            if 'comment' in data:
-                review.comment = data['comment']
+            if 'rating' in fields:
+                review.rating = fields['rating']
+            if 'comment' in fields:
+                review.comment = fields['comment']
             
             db.session.commit()
-            return make_response(
-                jsonify(review.to_dict(rules=('-user.reviews', '-service_provider.reviews'))),
-                200
-            )
+            body = review.to_dict(rules=('-user.reviews', '-service_provider.reviews'))
+            events.publish('review.updated', body, review.service_provider_id)
+            return make_response(jsonify(body), 200)
+        except ValidationError as e:
+            return make_response(jsonify({"error": str(e), "errors": e.errors}), 400)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
         except Exception as e:
@@ -241,20 +436,74 @@ class ReviewByID(Resource):
             return make_response(jsonify({"error": "Review not found"}), 404)
         
         try:
+            service_provider_id = review.service_provider_id
             db.session.delete(review)
             db.session.commit()
+            events.publish('review.deleted', {'id': id, 'service_provider_id': service_provider_id}, service_provider_id)
             return make_response(jsonify({"message": "Review deleted successfully"}), 200)
         except Exception as e:
             return make_response(jsonify({"error": "Failed to delete review"}), 400)
 
 
+# Export Routes
+class Export(Resource):
+    def get(self, resource):
+        if resource not in EXPORT_MODELS:
+            return make_response(jsonify({"error": "Unknown export resource"}), 404)
+
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return make_response(jsonify({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400)
+        gzip = request.args.get('gzip') == '1'
+
+        response = Response(
+            stream_with_context(export_stream(resource, fmt, gzip)),
+            mimetype=EXPORT_FORMATS[fmt]
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename={resource}.{fmt}'
+        if gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+# Server-Sent Event Routes
+class Events(Resource):
+    def get(self):
+        service_id = request.args.get('service_provider_id', type=int)
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            return make_response(jsonify({"error": "Last-Event-ID must be an integer"}), 400)
+
+        response = Response(events.subscribe(last_id, service_id), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+
+# Admission Control Routes
+class AdmissionStats(Resource):
+    def get(self):
+        return make_response(jsonify(admission.stats()), 200)
+
+
 # Register API Resources
 api.add_resource(Users, '/api/users')
 api.add_resource(UserByID, '/api/users/<int:id>')
+api.add_resource(UserSummary, '/api/users/<int:id>/summary')
+api.add_resource(UserReviews, '/api/users/<int:id>/reviews')
+api.add_resource(UserServices, '/api/users/<int:id>/services')
+api.add_resource(UserRecommendations, '/api/users/<int:id>/recommendations')
 api.add_resource(ServiceProviders, '/api/service-providers')
 api.add_resource(ServiceProviderByID, '/api/service-providers/<int:id>')
+api.add_resource(SimilarServiceProviders, '/api/service-providers/<int:id>/similar')
 api.add_resource(Reviews, '/api/reviews')
 api.add_resource(ReviewByID, '/api/reviews/<int:id>')
+api.add_resource(Export, '/api/export/<string:resource>')
+api.add_resource(Events, '/api/events')
+api.add_resource(AdmissionStats, '/api/admission/stats')
 
 
 if __name__ == '__main__':
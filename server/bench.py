@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import atexit
+import contextlib
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples):
+    print(f"{name}: n={len(samples)} "
+          f"p50={percentile(samples, 50) * 1000:.1f}ms "
+          f"p99={percentile(samples, 99) * 1000:.1f}ms "
+          f"max={max(samples, default=0) * 1000:.1f}ms")
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_provider():
+    """Create the schema if needed, then a user and one provider of theirs: (user_id, provider_id)"""
+    from config import db
+    from models import User, ServiceProvider
+
+    db.create_all()
+    user_id = db.session.execute(db.insert(User.__table__).values(
+        name='Bench', email=f'bench-{time.time()}@konekte.ht'
+    )).inserted_primary_key[0]
+    provider_id = db.session.execute(db.insert(ServiceProvider.__table__).values(
+        name='Bench Clinic', category='Medical/Health', description='Benchmark provider',
+        location='Port-au-Prince', user_id=user_id
+    )).inserted_primary_key[0]
+    db.session.commit()
+    return user_id, provider_id
+
+
+def bulk_reviews(count, batch=50000):
+    """Insert one user, one provider and `count` reviews with core inserts"""
+    from config import db
+    from models import Review
+
+    db.create_all()
+    if db.session.query(Review.id).count() >= count:
+        return
+    user_id, provider_id = bench_provider()
+    for start in range(0, count, batch):
+        db.session.execute(db.insert(Review.__table__), [
+            {'rating': i % 5 + 1, 'comment': f'Benchmark review {i}', 'user_id': user_id,
+             'service_provider_id': provider_id}
+            for i in range(start, min(count, start + batch))
+        ])
+    db.session.commit()
+
+
+def bench_admission(args):
+    """Overload the search endpoint and report tail latency per status code"""
+    from app import app
+    from config import admission
+
+    with app.app_context():
+        bench_provider()
+    latencies = {}
+    lock = threading.Lock()
+
+    def worker(n):
+        client = app.test_client()
+        environ = {'REMOTE_ADDR': f'10.0.{n // 256}.{n % 256}'}
+        for i in range(args.requests):
+            category = 'Emergency Services' if i % 10 == 0 else ''
+            started = time.perf_counter()
+            response = client.get(
+                f'/api/service-providers?search=a&category={category}',
+                environ_base=environ
+            )
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.setdefault(response.status_code, []).append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"{args.clients} clients x {args.requests} requests in {time.perf_counter() - started:.2f}s")
+    for status, samples in sorted(latencies.items()):
+        report(f"  {status}", samples)
+    print(admission.stats())
+
+
+def _load_reviews(count):
+    from app import app
+
+    with app.app_context():
+        bulk_reviews(count)
+
+
+def bench_export(args):
+    """Stream the reviews export and record bytes, time and peak RSS"""
+    import multiprocessing
+
+    # Load in a child process, so this process's peak RSS is the export's alone
+    loader = multiprocessing.Process(target=_load_reviews, args=(args.rows,))
+    loader.start()
+    loader.join()
+
+    from app import app
+    from config import admission
+
+    admission.enabled = False
+    print(f"peak RSS before export: {peak_rss_mb():.1f} MB")
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(f'/api/export/reviews?format={args.format}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    print(f"exported {size / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s")
+    print(f"peak RSS after export: {peak_rss_mb():.1f} MB")
+
+
+@contextlib.contextmanager
+def gunicorn_server(port, workers):
+    """Run the production gunicorn configuration on port until the block exits"""
+    import signal
+    import socket
+    import subprocess
+    import sys
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null'],
+        cwd=here, env=dict(os.environ, ADMISSION_ENABLED='0'),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # Wait for the master to listen (workers are warmed before their first accept)
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield server
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+def bench_events(args):
+    """Hold N idle HTTP subscribers on gunicorn; time fan-out per event and API reads meanwhile"""
+    import http.client
+    import json
+    import selectors
+    import socket
+    from app import app
+
+    with app.app_context():
+        user_id, provider_id = bench_provider()
+    review = json.dumps({'rating': 5, 'comment': 'Benchmark review',
+                         'user_id': user_id, 'service_provider_id': provider_id})
+
+    with gunicorn_server(args.port, args.workers):
+        api = http.client.HTTPConnection('127.0.0.1', args.port)
+        for subscribers in args.subscribers:
+            selector = selectors.DefaultSelector()
+            # Per stream: [event frames received, unparsed tail, subscribed]
+            received = []
+            for n in range(subscribers):
+                sock = socket.create_connection(('127.0.0.1', args.port))
+                sock.sendall(b'GET /api/events HTTP/1.1\r\nHost: bench\r\n\r\n')
+                sock.setblocking(False)
+                received.append([0, b'', False])
+                selector.register(sock, selectors.EVENT_READ, n)
+
+            def pump(frames, timeout):
+                """Read every stream until each is subscribed and has seen `frames` events"""
+                started = time.perf_counter()
+                deadline = time.monotonic() + timeout
+                while any(count < frames or not ready for count, _, ready in received):
+                    if time.monotonic() > deadline:
+                        break
+                    for key, _ in selector.select(0.5):
+                        stream = received[key.data]
+                        data = stream[1] + key.fileobj.recv(65536)
+                        # The retry hint is sent once subscribed; each event starts with its id line
+                        stream[2] = stream[2] or b'retry: ' in data
+                        stream[0] += data.count(b'\nid: ')
+                        stream[1] = data[-6:]
+                return time.perf_counter() - started
+
+            pump(0, 60)
+            reads = []
+            for _ in range(20):
+                started = time.perf_counter()
+                api.request('GET', '/api/service-providers?per_page=1')
+                api.getresponse().read()
+                reads.append(time.perf_counter() - started)
+
+            publish_times, fan_out = [], []
+            for i in range(args.events):
+                started = time.perf_counter()
+                api.request('POST', '/api/reviews', review, {'Content-Type': 'application/json'})
+                api.getresponse().read()
+                publish_times.append(time.perf_counter() - started)
+                fan_out.append(publish_times[-1] + pump(i + 1, 30))
+            delivered = sum(stream[0] for stream in received)
+            print(f"{subscribers} streams: {delivered}/{subscribers * args.events} events delivered")
+            report("  GET /api/service-providers with streams open", reads)
+            report("  POST /api/reviews", publish_times)
+            report("  POST until every stream has the event", fan_out)
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+        api.close()
+
+
+def bench_delete(args):
+    """Time deleting a provider as its review count grows"""
+    from app import app
+    from config import db, admission
+    from models import User, ServiceProvider, Review
+
+    admission.enabled = False
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        user_id = db.session.execute(db.insert(User.__table__).values(
+            name='Bench', email=f'bench-{time.time()}@konekte.ht'
+        )).inserted_primary_key[0]
+        for count in args.reviews:
+            provider_id = db.session.execute(db.insert(ServiceProvider.__table__).values(
+                name='Bench Clinic', category='Medical/Health', description='Benchmark provider',
+                location='Port-au-Prince', user_id=user_id
+            )).inserted_primary_key[0]
+            db.session.execute(db.insert(Review.__table__), [
+                {'rating': 5, 'comment': 'Benchmark review', 'user_id': user_id, 'service_provider_id': provider_id}
+                for _ in range(count)
+            ])
+            db.session.commit()
+
+            started = time.perf_counter()
+            response = client.delete(f'/api/service-providers/{provider_id}')
+            elapsed = time.perf_counter() - started
+            remaining = db.session.query(Review.id).filter_by(service_provider_id=provider_id).count()
+            print(f"{count} reviews: DELETE {response.status_code} in {elapsed * 1000:.1f}ms, {remaining} left")
+
+
+def bench_similar(args):
+    """Build similar-provider lists for a synthetic corpus and time lookups"""
+    import random
+    from app import app
+    from config import db
+    from models import User, ServiceProvider
+    from config import admission
+    from similarity import refresh_similar
+
+    rng = random.Random(42)
+    words = [f'mot{i}' for i in range(args.vocabulary)]
+    weights = [1 / (i + 1) for i in range(args.vocabulary)]
+    communes = [f'Commune {i}' for i in range(140)]
+    categories = ['Medical/Health', 'Education', 'Water & Sanitation', 'Community Centers', 'Emergency Services']
+
+    admission.enabled = False
+    with app.app_context():
+        db.create_all()
+        if db.session.query(ServiceProvider.id).count() < args.providers:
+            user_id = db.session.execute(db.insert(User.__table__).values(
+                name='Bench', email=f'bench-{time.time()}@konekte.ht'
+            )).inserted_primary_key[0]
+            db.session.execute(db.insert(ServiceProvider.__table__), [{
+                'name': ' '.join(rng.choices(words, weights, k=3)),
+                'category': rng.choice(categories),
+                'description': ' '.join(rng.choices(words, weights, k=25)),
+                'location': f'Rue {rng.randint(1, 500)}, {rng.choice(communes)}',
+                'user_id': user_id,
+            } for _ in range(args.providers)])
+            db.session.commit()
+
+        started = time.perf_counter()
+        count = refresh_similar(k=args.k)
+        print(f"built top-{args.k} for {count} providers in {time.perf_counter() - started:.1f}s, "
+              f"peak RSS {peak_rss_mb():.0f} MB")
+        ids = db.session.execute(db.select(ServiceProvider.id)).scalars().all()
+
+    client = app.test_client()
+    samples = []
+    for service_id in rng.sample(ids, min(1000, len(ids))):
+        started = time.perf_counter()
+        response = client.get(f'/api/service-providers/{service_id}/similar')
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    report("GET /similar", samples)
+
+
+def bench_recommendations(args):
+    """Run the recommendation job on synthetic reviews and record time and peak RSS"""
+    import numpy as np
+    from app import app
+    from config import db
+    from models import User, ServiceProvider, Review
+    from recommend import refresh_recommendations
+
+    rng = np.random.default_rng(42)
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Review.id).count() < args.reviews:
+            db.session.execute(db.insert(User.__table__), [
+                {'id': i, 'name': f'User {i}', 'email': f'user{i}@konekte.ht'} for i in range(1, args.users + 1)
+            ])
+            db.session.execute(db.insert(ServiceProvider.__table__), [{
+                'id': i, 'name': f'Service {i}', 'category': 'Medical/Health', 'description': 'Benchmark provider',
+                'location': 'Port-au-Prince', 'user_id': 1,
+            } for i in range(1, args.providers + 1)])
+            # Popular providers get most reviews, as in practice
+            for start in range(0, args.reviews, 100_000):
+                size = min(100_000, args.reviews - start)
+                users = rng.integers(1, args.users + 1, size)
+                providers = np.minimum(rng.zipf(1.3, size), args.providers)
+                ratings = rng.integers(1, 6, size)
+                db.session.execute(db.insert(Review.__table__), [
+                    {'rating': int(r), 'comment': 'Benchmark review', 'user_id': int(u), 'service_provider_id': int(p)}
+                    for u, p, r in zip(users, providers, ratings)
+                ])
+            db.session.commit()
+        print(f"peak RSS after load: {peak_rss_mb():.0f} MB")
+
+        started = time.perf_counter()
+        count = refresh_recommendations(workers=args.workers, memory_mb=args.memory_mb)
+        print(f"recommendations for {count} users from {args.reviews} reviews in "
+              f"{time.perf_counter() - started:.1f}s, peak RSS {peak_rss_mb():.0f} MB")
+
+
+def bench_client(args):
+    """Count requests and bytes for a first and a repeat load of the React build"""
+    import re
+    from app import app
+    from config import admission
+
+    admission.enabled = False
+    client = app.test_client()
+    for label, encoding in (('identity', 'identity'), ('gzip', 'gzip'), ('br', 'br, gzip')):
+        headers = {'Accept-Encoding': encoding}
+        page = client.get('/', headers=headers)
+        html = client.get('/', headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+        assets = re.findall(r'(?:src|href)="(/static/[^"]+)"', html)
+        responses = [page] + [client.get(asset, headers=headers) for asset in assets]
+        assert all(response.status_code == 200 for response in responses)
+        size = sum(len(response.get_data()) for response in responses)
+        print(f"{label}: {len(responses)} requests, {size / 1024:.1f} KB")
+
+    # A repeat visit revalidates only the shell; immutable assets come from cache
+    etag = page.headers.get('ETag')
+    repeat = client.get('/', headers=dict(headers, **({'If-None-Match': etag} if etag else {})))
+    cacheable = sum('immutable' in response.headers.get('Cache-Control', '') for response in responses)
+    print(f"repeat visit: 1 request ({repeat.status_code}), {cacheable} assets served from cache")
+
+
+def bench_shards(args):
+    """Compare a one-region listing on its shard with the same query on the national database"""
+    import random
+    import tempfile
+
+    shard_dir = args.shard_dir or tempfile.mkdtemp(prefix='konekte-shards-')
+    os.environ['SHARD_URL_TEMPLATE'] = f'sqlite:///{shard_dir}/{{region}}.db'
+    from app import app, shards
+    from config import db
+    from models import REGIONS, User, ServiceProvider, ServiceHours, provider_filters
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        if db.session.query(ServiceProvider.id).count() < args.national:
+            db.session.execute(db.insert(User.__table__), [{'id': 1, 'name': 'Bench', 'email': 'bench@konekte.ht'}])
+            # The benchmarked region stays the same size whatever the national total
+            others = [region for region in REGIONS if region != args.region]
+            rows = [{
+                'id': i,
+                'name': f'Service {i}',
+                'category': 'Medical/Health',
+                'description': f'Clinique communautaire {rng.randint(1, 50)}',
+                'location': 'Rue principale',
+                'region': args.region if i <= args.region_size else rng.choice(others),
+                'user_id': 1,
+            } for i in range(1, args.national + 1)]
+            db.session.execute(db.insert(ServiceProvider.__table__), rows)
+            db.session.commit()
+            for region, engine in shards.engines.items():
+                regional = [row for row in rows if row['region'] == region]
+                if regional:
+                    with engine.begin() as connection:
+                        connection.execute(db.insert(shards.providers), regional)
+
+        filters = dict(region=args.region, search='communautaire 7')
+        central, sharded = [], []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            ServiceProvider.query.filter(
+                *provider_filters(ServiceProvider.__table__, ServiceHours.__table__, **filters)
+            ).all()
+            central.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            shards.service_providers(**filters)
+            sharded.append(time.perf_counter() - started)
+        print(f"{args.national} providers nationally, {args.region_size} in {args.region}:")
+        report("  national database", central)
+        report("  regional shard", sharded)
+
+
+def bench_idempotency(args):
+    """Send the same POST with one Idempotency-Key from parallel clients"""
+    import uuid
+    from app import app
+    from config import db, admission
+    from models import Review
+
+    # Measure deduplication, not rate limiting
+    admission.enabled = False
+    with app.app_context():
+        user_id, service_id = bench_provider()
+        before = db.session.query(Review.id).count()
+
+    key = str(uuid.uuid4())
+    payload = {'rating': 5, 'comment': 'Idempotency benchmark', 'user_id': user_id, 'service_provider_id': service_id}
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(args.clients)
+
+    def worker():
+        client = app.test_client()
+        start.wait()
+        started = time.perf_counter()
+        response = client.post('/api/reviews', json=payload, headers={'Idempotency-Key': key})
+        with lock:
+            results.append((response.status_code, response.json.get('id'),
+                            response.headers.get('Idempotent-Replayed'), time.perf_counter() - started))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        created = db.session.query(Review.id).count() - before
+    statuses = {}
+    for status, _, replayed, _ in results:
+        label = f"{status}{' replayed' if replayed else ''}"
+        statuses[label] = statuses.get(label, 0) + 1
+    print(f"{args.clients} parallel POSTs, one key: {created} review(s) created, "
+          f"{len({review_id for _, review_id, _, _ in results if review_id})} distinct id(s), {statuses}")
+    report("  latency", [elapsed for *_, elapsed in results])
+
+
+def bench_readmodel(args):
+    """Compare provider listings from SQL and from the in-memory read model"""
+    import random
+    from app import app, read_model
+    from config import db, admission
+    from models import User, ServiceProvider
+
+    rng = random.Random(42)
+    categories = ['Medical/Health', 'Education', 'Water & Sanitation', 'Community Centers', 'Emergency Services']
+    admission.enabled = False
+    with app.app_context():
+        db.create_all()
+        if db.session.query(ServiceProvider.id).count() < args.providers:
+            user_id = db.session.execute(db.insert(User.__table__).values(
+                name='Bench', email=f'bench-{time.time()}@konekte.ht'
+            )).inserted_primary_key[0]
+            db.session.execute(db.insert(ServiceProvider.__table__), [{
+                'name': f'Service {i}',
+                'category': rng.choice(categories),
+                'description': f'Clinique communautaire {rng.randint(1, 500)} pour toute la famille',
+                'location': f'Rue {rng.randint(1, 500)}, Commune {rng.randint(1, 140)}',
+                'phone': '509-1234-5678',
+                'user_id': user_id,
+            } for i in range(args.providers)])
+            db.session.commit()
+
+        started = time.perf_counter()
+        snapshot = read_model.rebuild()
+        print(f"loaded {snapshot.size} providers in {time.perf_counter() - started:.2f}s, "
+              f"{snapshot.nbytes() / 1024 / 1024:.1f} MB "
+              f"({snapshot.nbytes() / 1024 / 1024 * 100000 / max(snapshot.size, 1):.1f} MB per 100k providers)")
+        provider_id = int(snapshot.ids[snapshot.size // 2])
+        started = time.perf_counter()
+        read_model.patch(provider_id)
+        print(f"patched one provider in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    client = app.test_client()
+    queries = {
+        'category': 'category=Emergency Services',
+        'search': 'search=communautaire 42',
+        'category+search': 'category=Education&search=commune 7',
+    }
+    for name, query in queries.items():
+        for enabled in (False, True):
+            read_model.enabled = enabled
+            samples = []
+            for _ in range(args.queries):
+                started = time.perf_counter()
+                response = client.get(f'/api/service-providers?{query}')
+                samples.append(time.perf_counter() - started)
+            report(f"  {name} ({len(response.json)} rows) {'read model' if enabled else 'SQL'}", samples)
+
+
+def bench_validation(args):
+    """Validator throughput per million records, against building ORM objects"""
+    import random
+    from app import app
+    from models import ServiceProvider, Review
+    from validation import SERVICE_PROVIDER_SCHEMA, REVIEW_SCHEMA
+
+    rng = random.Random(42)
+    categories = ['Medical/Health', 'Education', 'Water & Sanitation', 'Community Centers', 'Emergency Services']
+    # One record in ten is invalid, so error collection is measured too
+    reviews = [{
+        'rating': rng.randint(1, 5) if i % 10 else 9,
+        'comment': f'Benchmark review {i}',
+        'user_id': rng.randint(1, 1000),
+        'service_provider_id': rng.randint(1, 1000),
+    } for i in range(args.records)]
+    providers = [{
+        'name': f'Service {i}',
+        'category': rng.choice(categories) if i % 10 else 'Unknown',
+        'description': 'Clinique communautaire pour toute la famille',
+        'location': f'Rue {rng.randint(1, 500)}, Port-au-Prince',
+        'phone': '(509) 3456-7890',
+        'hours': 'Lundi-Vendredi: 8h-16h',
+        'region': 'Ouest',
+        'user_id': 1,
+    } for i in range(args.records)]
+
+    per_million = 1000000 / args.records
+    for name, schema, records, model in (('reviews', REVIEW_SCHEMA, reviews, Review),
+                                         ('service providers', SERVICE_PROVIDER_SCHEMA, providers, ServiceProvider)):
+        started = time.perf_counter()
+        valid, invalid = schema.validate_many(records)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: validate_many {elapsed * per_million:.2f}s per million records "
+              f"({args.records / elapsed:,.0f}/s, {len(valid)} valid, {len(invalid)} rejected)")
+
+        # The old path: every record becomes an ORM object before it is checked
+        sample = records[:args.orm_records]
+        with app.app_context():
+            started = time.perf_counter()
+            for record in sample:
+                try:
+                    model(**record)
+                except ValueError:
+                    pass
+            elapsed = time.perf_counter() - started
+        print(f"  ORM construction {elapsed * 1000000 / len(sample):.2f}s per million records "
+              f"({len(sample) / elapsed:,.0f}/s)")
+
+
+def _load_client(args):
+    """One load-generating process: keep-alive GETs until the deadline"""
+    import http.client
+
+    port, path, deadline = args
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    samples = []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            connection.getresponse().read()
+        except (http.client.HTTPException, ConnectionError):
+            # Keep-alive timeout or a recycled worker: reconnect
+            connection.close()
+            continue
+        samples.append(time.perf_counter() - started)
+    connection.close()
+    return samples
+
+
+def bench_prefork(args):
+    """Throughput of the gunicorn configuration as workers are added"""
+    import multiprocessing
+
+    from app import app
+    from config import db
+
+    with app.app_context():
+        # A fresh database gets provider 1, the default --path
+        bench_provider()
+        db.engine.dispose()
+    print(f"{os.cpu_count()} CPU cores, {args.clients} client processes, GET {args.path}")
+    for workers in args.workers:
+        port = args.port + workers
+        with gunicorn_server(port, workers):
+            deadline = time.monotonic() + args.seconds
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(_load_client, [(port, args.path, deadline)] * args.clients)
+            samples = [sample for result in results for sample in result]
+            print(f"{workers} worker(s): {len(samples) / args.seconds:,.0f} req/s")
+            report("  latency", samples)
+
+
+def bench_user_summary(args):
+    """A heavy reviewer's summary and review pages against loading every relation"""
+    from app import app
+    from config import db, admission
+    from models import User
+
+    admission.enabled = False
+    with app.app_context():
+        bulk_reviews(args.reviews)
+        user_id = db.session.execute(db.select(User.id).order_by(User.id)).scalar()
+
+        # The old approach: serialize every owned service and review
+        samples = []
+        for _ in range(args.queries):
+            db.session.remove()
+            started = time.perf_counter()
+            user = db.session.get(User, user_id)
+            [service.to_dict() for service in user.service_providers]
+            reviews = [review.to_dict() for review in user.reviews]
+            samples.append(time.perf_counter() - started)
+        db.session.remove()
+        print(f"user {user_id} with {len(reviews)} reviews:")
+        report("  full relation load", samples)
+
+    client = app.test_client()
+    oldest = min(review['id'] for review in reviews)
+    for name, path in (('GET /summary', f'/api/users/{user_id}/summary'),
+                       ('GET /reviews first page', f'/api/users/{user_id}/reviews'),
+                       ('GET /reviews last page', f'/api/users/{user_id}/reviews?before={oldest + 20}')):
+        samples = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            client.get(path)
+            samples.append(time.perf_counter() - started)
+        report(f"  {name}", samples)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Konekte API benchmarks')
+    parser.add_argument('--database', help='database URL to benchmark against '
+                        '(default: a temporary SQLite file, deleted afterwards)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sub = commands.add_parser('admission', help='load test admission control')
+    sub.add_argument('--clients', type=int, default=64)
+    sub.add_argument('--requests', type=int, default=20)
+    sub.set_defaults(func=bench_admission)
+
+    sub = commands.add_parser('export', help='stream a large reviews export')
+    sub.add_argument('--rows', type=int, default=5_000_000)
+    sub.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    sub.set_defaults(func=bench_export)
+
+    sub = commands.add_parser('events', help='server-sent event fan-out')
+    sub.add_argument('--subscribers', type=int, nargs='+', default=[10, 100, 1000])
+    sub.add_argument('--events', type=int, default=100)
+    sub.add_argument('--workers', type=int, default=2)
+    sub.add_argument('--port', type=int, default=5700)
+    sub.set_defaults(func=bench_events)
+
+    sub = commands.add_parser('delete', help='delete providers with many reviews')
+    sub.add_argument('--reviews', type=int, nargs='+', default=[10, 1000, 10000, 50000])
+    sub.set_defaults(func=bench_delete)
+
+    sub = commands.add_parser('similar', help='similar provider build and lookup')
+    sub.add_argument('--providers', type=int, default=100_000)
+    sub.add_argument('--vocabulary', type=int, default=20_000)
+    sub.add_argument('-k', type=int, default=10)
+    sub.set_defaults(func=bench_similar)
+
+    sub = commands.add_parser('recommendations', help='collaborative filtering job')
+    sub.add_argument('--reviews', type=int, default=1_000_000)
+    sub.add_argument('--users', type=int, default=100_000)
+    sub.add_argument('--providers', type=int, default=10_000)
+    sub.add_argument('--workers', type=int, default=None)
+    sub.add_argument('--memory-mb', type=int, default=256)
+    sub.set_defaults(func=bench_recommendations)
+
+    sub = commands.add_parser('client', help='page-load requests and bytes for the React build')
+    sub.set_defaults(func=bench_client)
+
+    sub = commands.add_parser('shards', help='regional shard vs national query latency')
+    sub.add_argument('--national', type=int, default=100_000)
+    sub.add_argument('--region', default='Nord')
+    sub.add_argument('--region-size', type=int, default=1000)
+    sub.add_argument('--queries', type=int, default=50)
+    sub.add_argument('--shard-dir', help='default: a new temporary directory')
+    sub.set_defaults(func=bench_shards)
+
+    sub = commands.add_parser('readmodel', help='SQL vs in-memory provider listings')
+    sub.add_argument('--providers', type=int, default=100000)
+    sub.add_argument('--queries', type=int, default=50)
+    sub.set_defaults(func=bench_readmodel)
+
+    sub = commands.add_parser('validation', help='validator throughput per million records')
+    sub.add_argument('--records', type=int, default=1000000)
+    sub.add_argument('--orm-records', type=int, default=100000, help='sample for the ORM comparison')
+    sub.set_defaults(func=bench_validation)
+
+    sub = commands.add_parser('prefork', help='gunicorn throughput by worker count')
+    sub.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    sub.add_argument('--clients', type=int, default=16, help='load-generating processes')
+    sub.add_argument('--seconds', type=float, default=10)
+    sub.add_argument('--path', default='/api/service-providers/1')
+    sub.add_argument('--port', type=int, default=5600)
+    sub.set_defaults(func=bench_prefork)
+
+    sub = commands.add_parser('user-summary', help='user summary vs full relation load')
+    sub.add_argument('--reviews', type=int, default=50000)
+    sub.add_argument('--queries', type=int, default=20)
+    sub.set_defaults(func=bench_user_summary)
+
+    sub = commands.add_parser('idempotency', help='parallel retries with one Idempotency-Key')
+    sub.add_argument('--clients', type=int, default=32)
+    sub.set_defaults(func=bench_idempotency)
+
+    args = parser.parse_args()
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    else:
+        # Benchmarks insert and delete rows: never touch the development database
+        directory = tempfile.mkdtemp(prefix='konekte-bench-')
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    args.func(args)
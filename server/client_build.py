@@ -0,0 +1,63 @@
+import mimetypes
+import os
+
+from flask import current_app, request, send_file, make_response, jsonify
+from werkzeug.security import safe_join
+
+
+# Content-hashed files under build/static never change, so cache them forever
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Precompressed variants written by `python jobs.py compress-client`, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def send_build_file(build_dir, filename, cache_control):
+    """Send a build file, preferring a precompressed variant the client accepts"""
+    path = safe_join(build_dir, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings.quality(encoding) > 0 and os.path.isfile(path + suffix):
+            response = send_file(path + suffix, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def init_client(app):
+    """Serve the production React build from CLIENT_BUILD_DIR, if it exists"""
+    build_dir = app.config.get('CLIENT_BUILD_DIR')
+    if not build_dir or not os.path.isfile(os.path.join(build_dir, 'index.html')):
+        return False
+
+    def static_asset(filename):
+        response = send_build_file(build_dir, os.path.join('static', filename), IMMUTABLE)
+        if response is None:
+            return make_response(jsonify({"error": "Not found"}), 404)
+        return response
+
+    def spa(path):
+        if path == 'api' or path.startswith('api/'):
+            return make_response(jsonify({"error": "Not found"}), 404)
+        # Top-level build files (favicon, manifest), else the app shell so
+        # client-side routes like /services/3 work on reload
+        return send_build_file(build_dir, path, REVALIDATE) or serve_index()
+
+    app.extensions['client_build'] = build_dir
+    app.add_url_rule('/static/<path:filename>', 'client_static', static_asset)
+    app.add_url_rule('/<path:path>', 'client_spa', spa)
+    return True
+
+
+def serve_index():
+    """The app shell when the React build is served, else None"""
+    build_dir = current_app.extensions.get('client_build')
+    return send_build_file(build_dir, 'index.html', REVALIDATE) if build_dir else None
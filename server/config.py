@@ -1,4 +1,6 @@
 # Standard library imports
+import os
+import sqlite3
 
 # Remote library imports
 from flask import Flask
@@ -6,26 +8,76 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Engine
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Local imports
+from admission import AdmissionControl
+from client_build import init_client
+from events import EventBroker
 
 # Instantiate app, set attributes
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+# The default /static route is replaced by the React build's hashed assets
+app = Flask(__name__, static_folder=None)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.json.compact = False
 
+# Opening hours are written and queried in Haiti local time
+app.config['LOCAL_TIMEZONE'] = 'America/Port-au-Prince'
+
+# Optional per-département shards, e.g. sqlite:////var/lib/konekte/{region}.db
+app.config['SHARD_URL_TEMPLATE'] = os.environ.get('SHARD_URL_TEMPLATE')
+
+# Optional in-memory read model for provider listings (READ_MODEL=1)
+app.config['READ_MODEL_ENABLED'] = os.environ.get('READ_MODEL') == '1'
+
 # Define metadata, instantiate db
 metadata = MetaData(naming_convention={
+    "ix": "ix_%(column_0_label)s",
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 db = SQLAlchemy(metadata=metadata)
-migrate = Migrate(app, db)
+
+# SQLite ignores foreign keys (and so ON DELETE CASCADE) unless enabled per connection
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+migrate = Migrate(app, db, render_as_batch=True)
 db.init_app(app)
 
 # Instantiate REST API
 api = Api(app)
 
-# Instantiate CORS
-CORS(app)
+# Serve the production React build (npm run build) when it exists, so the
+# client and API share an origin and API calls need no CORS preflight
+app.config['CLIENT_BUILD_DIR'] = os.environ.get(
+    'CLIENT_BUILD_DIR', os.path.join(os.path.dirname(__file__), '..', 'client', 'build')
+)
+init_client(app)
+
+# Instantiate CORS for the API only, for separately hosted clients such as
+# the React dev server; CORS_ORIGINS='' disables it. Preflights are cached.
+cors_origins = [origin for origin in os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',') if origin]
+if cors_origins:
+    CORS(app, resources={r'/api/*': {'origins': cors_origins}}, max_age=86400)
+
+# Behind N trusted reverse proxies (PROXY_FIX_HOPS=N), take the client IP
+# and scheme from their X-Forwarded-* headers; off by default, since a
+# client reaching the app directly could otherwise forge its IP
+proxy_hops = int(os.environ.get('PROXY_FIX_HOPS', 0))
+if proxy_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops, x_host=proxy_hops)
+
+# Instantiate admission control (rate limiting and load shedding);
+# ADMISSION_ENABLED=0 turns it off, e.g. for load tests from one IP
+app.config['ADMISSION_ENABLED'] = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+admission = AdmissionControl(app)
+
+# Instantiate event broker for server-sent events
+events = EventBroker()
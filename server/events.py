@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """Pub/sub for server-sent events.
+
+    Each event is serialized once into a bounded ring buffer. Subscribers
+    keep only a cursor (the last event id they sent) and wait on a condition
+    for their filter (one service provider, or everything), so a publish
+    wakes only the subscribers it concerns. Clients reconnecting with
+    Last-Event-ID are replayed from the buffer.
+
+    After init_app(app, db, model) events go through the event_log table,
+    which every worker process shares: publish inserts a row, and a poller
+    thread in each process appends new rows to its buffer in id order, so
+    ids are global and survive restarts. Without init_app the broker is
+    in-process only.
+
+    Listeners are called synchronously with the raw event data, once, in
+    the process that publishes (e.g. to queue work that must happen once
+    per write). Followers are called once per event in every process, as
+    the event reaches its buffer, whichever process published it (e.g. to
+    keep a per-process cache in step with every worker's writes).
+    """
+
+    def __init__(self, app=None, db=None, model=None, buffer_size=1000, heartbeat=15.0):
+        self.buffer = deque(maxlen=buffer_size)
+        self.heartbeat = heartbeat
+        self.last_id = 0
+        self.lock = threading.Lock()
+        # Filter (service provider id, or None for everything) -> [condition, waiters]
+        self.conditions = {}
+        # Per service provider: its latest event id, and its latest id pushed out of the buffer
+        self.latest = {}
+        self.evicted = {}
+        # Newest id no longer in the buffer, overall and from before this process started
+        self.evicted_id = 0
+        self.floor_id = 0
+        self.listeners = []
+        self.followers = []
+        self.db = None
+        self.poller_pid = None
+        self.start_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        app.config.setdefault('EVENTS_POLL_INTERVAL', 0.5)
+        self.app = app
+        self.db = db
+        self.model = model
+        self.poll_interval = app.config['EVENTS_POLL_INTERVAL']
+
+    def listen(self, callback):
+        """Call callback(event_type, data, service_provider_id) on every publish"""
+        self.listeners.append(callback)
+
+    def follow(self, callback):
+        """Call callback(event_id, event_type, service_provider_id) for every event this process receives"""
+        self.followers.append(callback)
+
+    def head(self):
+        """Id of the newest event published so far, by any process"""
+        if self.db is None:
+            return self.last_id
+        with self.db.engine.connect() as connection:
+            return connection.execute(self.db.select(self.db.func.max(self.model.id))).scalar() or 0
+
+    def publish(self, event_type, data, service_provider_id=None):
+        for callback in self.listeners:
+            try:
+                callback(event_type, data, service_provider_id)
+            except Exception:
+                # The write is already committed; a listener must not fail it
+                logger.exception("Event listener failed for %s", event_type)
+        payload = json.dumps(data, default=str, ensure_ascii=False)
+        if self.db is None:
+            with self.lock:
+                event_id = self.last_id + 1
+                self._append(event_id, event_type, service_provider_id, payload)
+            self._notify_followers([(event_id, event_type, service_provider_id)])
+            return event_id
+        try:
+            with self.db.engine.begin() as connection:
+                event_id = connection.execute(self.db.insert(self.model).values(
+                    event_type=event_type, service_provider_id=service_provider_id,
+                    data=payload, created_at=datetime.utcnow(),
+                )).inserted_primary_key[0]
+            # Delivered through the log, which keeps the buffer in id order across
+            # processes; polling now lets this process's followers see its own write
+            self._start_poller()
+            self._poll()
+        except Exception:
+            logger.exception("Publishing %s failed", event_type)
+            return None
+        return event_id
+
+    def _append(self, event_id, event_type, service_provider_id, payload):
+        # Caller holds self.lock
+        if len(self.buffer) == self.buffer.maxlen:
+            old_id, old_provider_id, _ = self.buffer[0]
+            self.evicted_id = old_id
+            if old_provider_id is not None:
+                self.evicted[old_provider_id] = old_id
+        text = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+        self.buffer.append((event_id, service_provider_id, text))
+        self.last_id = event_id
+        if service_provider_id is not None:
+            self.latest[service_provider_id] = event_id
+        for key in {None, service_provider_id}:
+            if key in self.conditions:
+                self.conditions[key][0].notify_all()
+
+    # Shared event log
+
+    def _start_poller(self):
+        # Threads do not survive fork: start one per process, on first use
+        if self.db is None or self.poller_pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.poller_pid == os.getpid():
+                return
+            self.wakeup = threading.Event()
+            with self.app.app_context():
+                self._poll(initial=True)
+            threading.Thread(target=self._run_poller, name='event-poller', daemon=True).start()
+            self.poller_pid = os.getpid()
+
+    def _run_poller(self):
+        with self.app.app_context():
+            while True:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                try:
+                    self._poll()
+                except Exception:
+                    logger.exception("Polling the event log failed")
+
+    def _poll(self, initial=False):
+        table = self.model.__table__
+        query = self.db.select(table.c.id, table.c.event_type, table.c.service_provider_id, table.c.data)
+        if initial:
+            # Fill the buffer with the most recent events, for Last-Event-ID replays
+            query = query.order_by(table.c.id.desc()).limit(self.buffer.maxlen)
+        else:
+            query = query.where(table.c.id > self.last_id).order_by(table.c.id)
+        with self.db.engine.connect() as connection:
+            rows = connection.execute(query).all()
+        if initial:
+            rows.reverse()
+        if not rows:
+            return
+        received = []
+        with self.lock:
+            if initial:
+                self.floor_id = self.evicted_id = rows[0].id - 1
+            for row in rows:
+                # SQLite serializes writers, so ids become visible in order
+                if row.id > self.last_id:
+                    self._append(row.id, row.event_type, row.service_provider_id, row.data)
+                    received.append((row.id, row.event_type, row.service_provider_id))
+        self._notify_followers(received)
+        # About once per buffer_size events
+        if not initial and rows[-1].id % self.buffer.maxlen < len(rows):
+            self.prune()
+
+    def _notify_followers(self, received):
+        for callback in self.followers:
+            for event_id, event_type, service_provider_id in received:
+                try:
+                    callback(event_id, event_type, service_provider_id)
+                except Exception:
+                    logger.exception("Event follower failed for %s", event_type)
+
+    def prune(self):
+        """Delete log rows that have left every process's ring buffer"""
+        cutoff = self.last_id - self.buffer.maxlen
+        with self.db.engine.begin() as connection:
+            connection.execute(self.db.delete(self.model).where(self.model.id <= cutoff))
+
+    # Subscribers
+
+    def since(self, last_id, service_provider_id=None):
+        """Return (events after last_id, whether events for the filter were lost)"""
+        with self.lock:
+            if last_id >= self.last_id:
+                return [], False
+            if service_provider_id is None:
+                missed = self.evicted_id > last_id
+            else:
+                missed = max(self.floor_id, self.evicted.get(service_provider_id, 0)) > last_id
+            # Ids can have gaps, so walk back from the newest event
+            events = []
+            for event in reversed(self.buffer):
+                if event[0] <= last_id:
+                    break
+                events.append(event)
+            events.reverse()
+            return events, missed
+
+    def wait(self, last_id, timeout, service_provider_id=None):
+        """Block until an event for the filter is newer than last_id, or timeout"""
+        key = service_provider_id
+        with self.lock:
+            entry = self.conditions.get(key)
+            if entry is None:
+                entry = self.conditions[key] = [threading.Condition(self.lock), 0]
+            entry[1] += 1
+            try:
+                if key is None:
+                    return entry[0].wait_for(lambda: self.last_id > last_id, timeout)
+                return entry[0].wait_for(lambda: self.latest.get(key, 0) > last_id, timeout)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.conditions[key]
+
+    def subscribe(self, last_id=None, service_provider_id=None):
+        """Generator of SSE frames, optionally filtered to one service provider"""
+        self._start_poller()
+        # Take the cursor before the first frame: anything published while
+        # the client reads it must still be sent
+        reset = last_id is not None and last_id > self.last_id
+        if last_id is None or reset:
+            last_id = self.last_id
+        yield "retry: 3000\n\n"
+        if reset:
+            # An id from before the log was reset: the client's state is unknown
+            yield "event: reset\ndata: {}\n\n"
+        while True:
+            events, missed = self.since(last_id, service_provider_id)
+            if missed:
+                # The client fell too far behind: tell it to refetch everything
+                yield "event: reset\ndata: {}\n\n"
+            for event_id, provider_id, text in events:
+                last_id = event_id
+                if service_provider_id is None or provider_id == service_provider_id:
+                    yield text
+            if not self.wait(last_id, self.heartbeat, service_provider_id):
+                yield ": keep-alive\n\n"
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import zlib
+
+from config import db
+from models import User, ServiceProvider, Review
+
+
+EXPORT_MODELS = {
+    'users': User,
+    'service-providers': ServiceProvider,
+    'reviews': Review,
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched per round trip and bytes buffered before each yield
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_rows(model):
+    """Yield plain column tuples ordered by id without building ORM objects"""
+    columns = [getattr(model, name) for name in model.serialize_only]
+    statement = db.select(*columns).order_by(model.id).execution_options(
+        stream_results=True, yield_per=BATCH_SIZE
+    )
+    for row in db.session.execute(statement):
+        yield tuple(_plain(value) for value in row)
+
+
+def iter_ndjson(model):
+    fields = model.serialize_only
+    for row in iter_rows(model):
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+
+
+def iter_csv(model):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(model.serialize_only)
+    for row in iter_rows(model):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_chunks(lines):
+    """Group small text lines into ~CHUNK_SIZE byte chunks"""
+    parts = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(resource, fmt, gzip=False):
+    """Return the byte chunk generator for one export resource and format"""
+    model = EXPORT_MODELS[resource]
+    lines = iter_csv(model) if fmt == 'csv' else iter_ndjson(model)
+    chunks = iter_chunks(lines)
+    return iter_gzip(chunks) if gzip else chunks
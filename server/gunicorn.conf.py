@@ -0,0 +1,55 @@
+# Production server: `gunicorn -c gunicorn.conf.py` from server/
+# Every setting can be overridden on the command line (e.g. --workers 4).
+
+# Patch blocking calls before the app is preloaded, so every lock, thread
+# and socket it creates cooperates with the gevent workers
+from gevent import monkey
+monkey.patch_all()
+
+# Standard library imports
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:5555')
+
+# Prefork gevent workers: each connection is a greenlet, so idle
+# /api/events streams cost a little memory and no worker thread
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+
+# Import the app once in the master; workers share it copy-on-write
+preload_app = True
+
+# Recycle workers after a jittered number of requests, so slow leaks stay
+# bounded and workers do not all restart at once
+max_requests = int(os.environ.get('MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Worker heartbeats on tmpfs rather than a possibly slow disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+
+
+def when_ready(server):
+    # Master, app preloaded, no workers forked yet
+    from wsgi import warm_up
+    warm_up()
+
+
+def post_fork(server, worker):
+    from wsgi import after_fork
+    after_fork()
+
+
+def post_worker_init(worker):
+    # Runs before the worker's first accept
+    from wsgi import prime_worker
+    prime_worker()
@@ -0,0 +1,149 @@
+import re
+import unicodedata
+
+
+# Python weekday numbers (Monday is 0) for French and Kreyòl day names
+DAYS = {
+    'lundi': 0, 'lendi': 0,
+    'mardi': 1, 'madi': 1,
+    'mercredi': 2, 'mekredi': 2,
+    'jeudi': 3, 'jedi': 3,
+    'vendredi': 4, 'vandredi': 4,
+    'samedi': 5, 'samdi': 5,
+    'dimanche': 6, 'dimanch': 6,
+}
+ALL_DAYS = range(7)
+MINUTES_PER_DAY = 24 * 60
+
+_DAY = '(?:' + '|'.join(sorted(DAYS, key=len, reverse=True)) + r')\b'
+_TIME = r'(\d{1,2})\s*(?:h|:)\s*(\d{2})?'
+_TO = r'\s*(?:-|a|au|jiska)\s*'
+
+TOKENS = re.compile(
+    rf'(?P<always>24\s*/\s*7|24\s*h?\s*/\s*24)'
+    rf'|(?P<range>{_TIME}{_TO}{_TIME})'
+    rf'|(?P<daily>tous les jours|chak jou|tout jou|toujou)'
+    rf'|(?P<span>\b(?P<first>{_DAY}){_TO}(?P<last>{_DAY}))'
+    rf'|(?P<day>\b{_DAY})'
+    rf'|(?P<except>\b(?:sauf|excepte|sof|eksepte)\b)'
+    rf'|(?P<closed>\b(?:fermee?s?|femen)\b)'
+    rf'|(?P<sep>[,;.\n])'
+)
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c)).replace('–', '-')
+
+
+def _minutes(hours, minutes):
+    return min(int(hours), 24) * 60 + int(minutes or 0)
+
+
+def _add(intervals, day, opens, closes):
+    if closes <= opens:
+        # Past midnight: split into the evening and the next morning
+        intervals.add((day, opens, MINUTES_PER_DAY))
+        if closes:
+            intervals.add(((day + 1) % 7, 0, closes))
+    else:
+        intervals.add((day, opens, closes))
+
+
+def _subtract(intervals, days, start, end):
+    for day, opens, closes in list(intervals):
+        if day in days and opens < end and start < closes:
+            intervals.discard((day, opens, closes))
+            if opens < start:
+                intervals.add((day, opens, start))
+            if end < closes:
+                intervals.add((day, end, closes))
+
+
+def _group():
+    return {'days': set(), 'times': [], 'excluded': set(), 'closed': False}
+
+
+def parse_hours(text):
+    """Parse free-text opening hours into sorted (weekday, opens, closes) minute intervals.
+
+    "Lundi-Vendredi: 7h-17h, Samedi: 8h-14h" gives Monday to Friday 420-1020
+    and Saturday 480-840. A time range with no day before it applies to every
+    day. "sauf dimanche" removes days from its group, "Dimanche: fermé" closes
+    them everywhere, and "sauf 12h-13h" or "fermé de 12h à 13h" is a break.
+    A "fermé" naming no day closes every day, so text such as "Fermé pour
+    travaux" stores nothing. Other parts that cannot be understood are ignored.
+    """
+    if not text:
+        return []
+
+    # Each group is some days (every day if none are named) with their times
+    groups = [_group()]
+    breaks = []
+    # done: the group has its times or is closed, so a day starts a new group
+    done = False
+    previous = excepting = None
+    for match in TOKENS.finditer(_normalize(text)):
+        kind = match.lastgroup if match.group('span') is None else 'span'
+        group = groups[-1]
+        if kind in ('range', 'always'):
+            if kind == 'always':
+                times = (0, MINUTES_PER_DAY)
+            else:
+                (h1, m1), (h2, m2) = re.findall(_TIME, match.group('range'))
+                times = (_minutes(h1, m1), _minutes(h2, m2))
+            if previous in ('except', 'closed'):
+                # "sauf 12h-13h", "fermé de 12h à 13h": a break, not closed days
+                group['closed'] = False
+                breaks.append((group['days'] or set(ALL_DAYS), *times))
+            else:
+                if group['closed']:
+                    # "Fermé le dimanche, 8h-16h": the times are for the other days
+                    groups.append(_group())
+                    group = groups[-1]
+                group['times'].append(times)
+            done = True
+            excepting = False
+        elif kind == 'except':
+            excepting = True
+        elif kind == 'closed':
+            if done:
+                groups.append(_group())
+                group = groups[-1]
+            group['closed'] = True
+            done = bool(group['days'])
+            excepting = False
+        elif kind == 'sep':
+            excepting = False
+            done = done or (group['closed'] and bool(group['days']))
+        else:
+            if kind == 'daily':
+                days = set(ALL_DAYS)
+            elif kind == 'span':
+                first, last = DAYS[match.group('first')], DAYS[match.group('last')]
+                days = {(first + i) % 7 for i in range((last - first) % 7 + 1)}
+            else:
+                days = {DAYS[match.group('day')]}
+            if excepting:
+                group['excluded'].update(days)
+            else:
+                if done:
+                    groups.append(_group())
+                    group = groups[-1]
+                    done = False
+                group['days'].update(days)
+        previous = kind
+
+    closed = set()
+    for group in groups:
+        if group['closed']:
+            closed.update(group['days'] or ALL_DAYS)
+    intervals = set()
+    for group in groups:
+        for day in (group['days'] or set(ALL_DAYS)) - group['excluded'] - closed:
+            for opens, closes in group['times']:
+                _add(intervals, day, opens, closes)
+    for days, start, end in breaks:
+        if start < end:
+            _subtract(intervals, days, start, end)
+    return sorted(intervals)
@@ -0,0 +1,152 @@
+import hashlib
+import itertools
+import time
+from datetime import datetime, timedelta
+
+from flask import request, g, make_response, jsonify
+from sqlalchemy.exc import IntegrityError
+
+
+class Idempotency:
+    """Flask extension replaying POST responses for a repeated Idempotency-Key.
+
+    Keys live in the idempotency_keys table so every worker process shares
+    them. The first request inserts the key (its own short transaction),
+    which makes it the single winner; duplicates that arrive while it runs
+    wait for the stored response, and later ones replay it without touching
+    the domain tables. Keys expire after IDEMPOTENCY_TTL seconds.
+
+    Keys are scoped to the client address, so two clients that pick the same
+    key do not see each other's responses. Only 2xx and 4xx responses are
+    stored; a 5xx (e.g. the database was locked) releases the key so the
+    client's retry runs the request again.
+
+    The claim is a lease: if its worker dies before storing a response, the
+    row stays without one, and after IDEMPOTENCY_LOCK_TIMEOUT seconds the
+    next retry takes it over with a conditional update and runs the request.
+    """
+
+    def __init__(self, app=None, db=None, model=None):
+        self.counter = itertools.count()
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db, model):
+        app.config.setdefault('IDEMPOTENCY_TTL', 24 * 60 * 60)
+        app.config.setdefault('IDEMPOTENCY_WAIT', 5.0)
+        # Longer than any request may run (gunicorn's worker timeout is 30s)
+        app.config.setdefault('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+        self.db = db
+        self.model = model
+        self.ttl = app.config['IDEMPOTENCY_TTL']
+        self.wait = app.config['IDEMPOTENCY_WAIT']
+        self.lock_timeout = app.config['IDEMPOTENCY_LOCK_TIMEOUT']
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    @staticmethod
+    def scoped_key(key, client):
+        return hashlib.sha256(f'{client}\n{key}'.encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint():
+        digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+        digest.update(request.get_data())
+        return digest.hexdigest()
+
+    def _execute(self, statement):
+        with self.db.engine.begin() as connection:
+            return connection.execute(statement)
+
+    def _lookup(self, key):
+        with self.db.engine.connect() as connection:
+            return connection.execute(
+                self.db.select(self.model.__table__).where(self.model.key == key)
+            ).mappings().first()
+
+    def _take_over(self, key, fingerprint):
+        """Claim a key whose first request died mid-flight; True if this request won"""
+        now = datetime.utcnow()
+        model = self.model
+        result = self._execute(self.db.update(model).where(
+            model.key == key,
+            model.fingerprint == fingerprint,
+            model.status_code.is_(None),
+            model.created_at < now - timedelta(seconds=self.lock_timeout),
+        ).values(created_at=now))
+        return result.rowcount == 1
+
+    def evict_expired(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        self._execute(self.db.delete(self.model).where(self.model.created_at < cutoff))
+
+    def before_request(self):
+        key = request.headers.get('Idempotency-Key')
+        if request.method != 'POST' or not key or request.endpoint is None:
+            return None
+        if len(key) > 255:
+            return make_response(jsonify({"error": "Idempotency-Key must be at most 255 characters"}), 400)
+
+        # Cheap indexed delete, amortized over many requests
+        if next(self.counter) % 100 == 0:
+            self.evict_expired()
+
+        key = self.scoped_key(key, request.remote_addr)
+        fingerprint = self.fingerprint()
+        try:
+            self._execute(self.db.insert(self.model).values(
+                key=key, fingerprint=fingerprint, created_at=datetime.utcnow()
+            ))
+            g.idempotency_key = key
+            return None
+        except IntegrityError:
+            pass
+
+        # Someone else owns this key: wait for their response, then replay it
+        deadline = time.monotonic() + self.wait
+        while True:
+            stored = self._lookup(key)
+            if stored is None:
+                # The first attempt failed and released the key
+                return make_response(jsonify({"error": "Previous request with this Idempotency-Key failed, please retry"}), 409)
+            if stored['fingerprint'] != fingerprint:
+                return make_response(jsonify({"error": "Idempotency-Key was already used with a different request"}), 422)
+            if stored['status_code'] is not None:
+                response = make_response(stored['body'], stored['status_code'])
+                response.mimetype = stored['mimetype']
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if (datetime.utcnow() - stored['created_at']).total_seconds() > self.lock_timeout:
+                if self._take_over(key, fingerprint):
+                    g.idempotency_key = key
+                    return None
+                # Another retry took it over first: wait for its response
+                continue
+            if time.monotonic() >= deadline:
+                response = make_response(jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409)
+                response.headers['Retry-After'] = '1'
+                return response
+            time.sleep(0.05)
+
+    def after_request(self, response):
+        key = g.get('idempotency_key')
+        if key is None:
+            return response
+        if response.status_code >= 500:
+            # Let a retry run the request again
+            self._execute(self.db.delete(self.model).where(self.model.key == key))
+        else:
+            self._execute(self.db.update(self.model).where(self.model.key == key).values(
+                status_code=response.status_code,
+                mimetype=response.mimetype,
+                body=response.get_data()
+            ))
+        g.idempotency_key = None
+        return response
+
+    def teardown_request(self, exc):
+        # after_request is skipped when the view raised: release the key
+        key = g.pop('idempotency_key', None)
+        if key is not None:
+            self._execute(self.db.delete(self.model).where(self.model.key == key))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime
+
+# Remote library imports
+from sqlalchemy.exc import IntegrityError
+
+# Local imports
+from app import app
+from models import db, User, ServiceProvider, ServiceHours, Review
+from validation import USER_SCHEMA, SERVICE_PROVIDER_SCHEMA, REVIEW_SCHEMA
+
+
+# Targets for `jobs.py import`, named like the /api/export resources
+IMPORT_TARGETS = {
+    'users': (User, USER_SCHEMA),
+    'service-providers': (ServiceProvider, SERVICE_PROVIDER_SCHEMA),
+    'reviews': (Review, REVIEW_SCHEMA),
+}
+
+
+def backfill_hours(args):
+    """Rebuild service_hours from every provider's free-text hours"""
+    with app.app_context():
+        last_id = 0
+        total = 0
+        while True:
+            batch = (ServiceProvider.query
+                     .filter(ServiceProvider.id > last_id)
+                     .order_by(ServiceProvider.id)
+                     .limit(args.batch_size)
+                     .all())
+            if not batch:
+                break
+            for service in batch:
+                service.opening_hours = ServiceHours.from_text(service.hours)
+            db.session.commit()
+            last_id = batch[-1].id
+            total += len(batch)
+            print(f"Backfilled hours for {total} service providers")
+
+
+def similar(args):
+    """Precompute top-k similar providers (all, or only those missing a list)"""
+    from similarity import refresh_similar
+
+    with app.app_context():
+        count = refresh_similar(k=args.k, incremental=args.incremental)
+        print(f"Computed similar providers for {count} service providers")
+
+
+def recommendations(args):
+    """Factorize the user x provider review matrix and store top-n per user"""
+    from recommend import refresh_recommendations
+
+    with app.app_context():
+        count = refresh_recommendations(
+            n=args.n, factors=args.factors, workers=args.workers, memory_mb=args.memory_mb
+        )
+        print(f"Computed recommendations for {count} users")
+
+
+def compress_client(args):
+    """Write .gz (and .br, if the brotli package is installed) next to text build files"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("brotli not installed: writing .gz files only")
+
+    build_dir = args.build_dir or app.config['CLIENT_BUILD_DIR']
+    written = 0
+    for root, _, files in os.walk(build_dir):
+        for name in files:
+            if not name.endswith(('.html', '.js', '.css', '.json', '.svg', '.txt', '.map', '.ico')):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as source:
+                data = source.read()
+            with open(path + '.gz', 'wb') as target:
+                target.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli:
+                with open(path + '.br', 'wb') as target:
+                    target.write(brotli.compress(data, quality=11))
+            written += 1
+    print(f"Precompressed {written} files in {build_dir}")
+
+
+def shard_sync(args):
+    """Copy every provider, with its hours and reviews, into its regional shard"""
+    from app import shards
+
+    if not shards.enabled:
+        print("SHARD_URL_TEMPLATE is not set: nothing to do")
+        return
+    with app.app_context():
+        ids = db.session.execute(db.select(ServiceProvider.id).order_by(ServiceProvider.id)).scalars().all()
+        for count, service_id in enumerate(ids, 1):
+            shards.sync_provider(service_id, full=True)
+            if count % 1000 == 0:
+                print(f"Synced {count} service providers")
+        print(f"Synced {len(ids)} service providers to {len(shards.engines)} shards")
+
+
+def shard_reconcile(args):
+    """Retry queued shard copies now, ignoring their backoff, and report what is left"""
+    from app import shards
+    from models import PendingShardSync
+
+    if not shards.enabled:
+        print("SHARD_URL_TEMPLATE is not set: nothing to do")
+        return
+    with app.app_context():
+        queue = PendingShardSync.__table__
+        db.session.execute(db.update(queue).values(available_at=datetime.utcnow()))
+        db.session.commit()
+        synced = failed = 0
+        while True:
+            batch_synced, batch_failed = shards.reconcile()
+            synced += batch_synced
+            failed += batch_failed
+            if not batch_synced:
+                break
+        print(f"Synced {synced} providers, {failed} failed")
+        for entry in db.session.execute(db.select(queue).order_by(queue.c.id).limit(10)):
+            print(f"  provider {entry.service_provider_id} review {entry.review_id}: "
+                  f"{entry.attempts} attempts, {entry.last_error}")
+
+
+def import_records(args):
+    """Validate an NDJSON file (as written by /api/export) in batches and insert the valid rows"""
+    model, schema = IMPORT_TARGETS[args.resource]
+    opener = gzip.open if args.path.endswith('.gz') else open
+    imported = rejected = 0
+
+    def flush(records, lines):
+        nonlocal imported, rejected
+        # Plain dicts are checked and inserted with no ORM objects
+        valid, invalid = schema.validate_many(records, keep=('id',) if args.keep_ids else ())
+        for index, errors in invalid:
+            print(f"line {lines[index]}: {'; '.join(errors.values())}")
+        rejected += len(invalid)
+        if not valid:
+            return
+        try:
+            db.session.execute(db.insert(model.__table__), valid)
+            db.session.commit()
+            imported += len(valid)
+            return
+        except IntegrityError:
+            db.session.rollback()
+
+        # A duplicate id or email, or a missing user or provider, failed the
+        # whole batch: insert its rows one by one and reject only the bad ones
+        invalid_indexes = {index for index, _ in invalid}
+        valid_lines = [line for index, line in enumerate(lines) if index not in invalid_indexes]
+        for line, row in zip(valid_lines, valid):
+            try:
+                db.session.execute(db.insert(model.__table__), [row])
+                db.session.commit()
+                imported += 1
+            except IntegrityError as e:
+                db.session.rollback()
+                print(f"line {line}: {e.orig}")
+                rejected += 1
+
+    with app.app_context(), opener(args.path, 'rt', encoding='utf-8') as source:
+        records, lines = [], []
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"line {number}: not valid JSON")
+                rejected += 1
+                continue
+            lines.append(number)
+            if len(records) >= args.batch_size:
+                flush(records, lines)
+                records, lines = [], []
+        if records:
+            flush(records, lines)
+
+    print(f"Imported {imported} {args.resource}, rejected {rejected}")
+    if model is ServiceProvider and imported:
+        print("Run `python jobs.py backfill-hours` to index their opening hours")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Konekte batch jobs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sub = commands.add_parser('backfill-hours', help='parse free-text hours into service_hours')
+    sub.add_argument('--batch-size', type=int, default=500)
+    sub.set_defaults(func=backfill_hours)
+
+    sub = commands.add_parser('similar', help='precompute similar service providers')
+    sub.add_argument('-k', type=int, default=10)
+    sub.add_argument('--incremental', action='store_true', help='only providers without a list')
+    sub.set_defaults(func=similar)
+
+    sub = commands.add_parser('recommendations', help='precompute personalized recommendations')
+    sub.add_argument('-n', type=int, default=10)
+    sub.add_argument('--factors', type=int, default=32)
+    sub.add_argument('--workers', type=int, default=None, help='default: one per CPU')
+    sub.add_argument('--memory-mb', type=int, default=256, help='score matrix budget per block')
+    sub.set_defaults(func=recommendations)
+
+    sub = commands.add_parser('compress-client', help='precompress the React production build')
+    sub.add_argument('--build-dir', help='default: CLIENT_BUILD_DIR')
+    sub.set_defaults(func=compress_client)
+
+    sub = commands.add_parser('shard-sync', help='copy providers and reviews into regional shards')
+    sub.set_defaults(func=shard_sync)
+
+    sub = commands.add_parser('shard-reconcile', help='retry queued shard copies that failed')
+    sub.set_defaults(func=shard_reconcile)
+
+    sub = commands.add_parser('import', help='validate and bulk insert an NDJSON export')
+    sub.add_argument('resource', choices=sorted(IMPORT_TARGETS))
+    sub.add_argument('path', help='.ndjson or .ndjson.gz')
+    sub.add_argument('--batch-size', type=int, default=5000)
+    sub.add_argument('--keep-ids', action='store_true', help='insert the ids from the file')
+    sub.set_defaults(func=import_records)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,45 @@
+"""Add shard sync queue and placements
+
+Revision ID: 29ea13842620
+Revises: 981eee0dfe58
+Create Date: 2026-10-19 19:13:09.215448
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '29ea13842620'
+down_revision = '981eee0dfe58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pending_shard_syncs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('service_provider_id', sa.Integer(), nullable=False),
+    sa.Column('review_id', sa.Integer(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pending_shard_syncs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pending_shard_syncs_available_at'), ['available_at'], unique=False)
+
+    op.create_table('shard_placements',
+    sa.Column('service_provider_id', sa.Integer(), nullable=False),
+    sa.Column('region', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('service_provider_id')
+    )
+
+
+def downgrade():
+    op.drop_table('shard_placements')
+    with op.batch_alter_table('pending_shard_syncs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pending_shard_syncs_available_at'))
+
+    op.drop_table('pending_shard_syncs')
@@ -0,0 +1,47 @@
+"""Cascade deletes in the database and archive service providers
+
+Revision ID: 3f9c2a7d5e41
+Revises: 67dd4b8aa887
+Create Date: 2026-10-19 09:12:05.412877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d5e41'
+down_revision = '67dd4b8aa887'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+        batch_op.drop_constraint('fk_service_providers_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_service_providers_user_id_users', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_reviews_user_id_users', type_='foreignkey')
+        batch_op.drop_constraint('fk_reviews_service_provider_id_service_providers', type_='foreignkey')
+        batch_op.create_foreign_key('fk_reviews_user_id_users', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_foreign_key('fk_reviews_service_provider_id_service_providers', 'service_providers', ['service_provider_id'], ['id'], ondelete='CASCADE')
+        # The cascade from a provider deletes by this column, so it needs an index
+        batch_op.create_index('ix_reviews_service_provider_id', ['service_provider_id'], unique=False)
+        batch_op.create_index('ix_reviews_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_user_id')
+        batch_op.drop_index('ix_reviews_service_provider_id')
+        batch_op.drop_constraint('fk_reviews_service_provider_id_service_providers', type_='foreignkey')
+        batch_op.drop_constraint('fk_reviews_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_reviews_service_provider_id_service_providers', 'service_providers', ['service_provider_id'], ['id'])
+        batch_op.create_foreign_key('fk_reviews_user_id_users', 'users', ['user_id'], ['id'])
+
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_service_providers_user_id_users', type_='foreignkey')
+        batch_op.create_foreign_key('fk_service_providers_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.drop_column('archived_at')
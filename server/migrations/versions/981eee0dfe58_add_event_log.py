@@ -0,0 +1,32 @@
+"""Add event log
+
+Revision ID: 981eee0dfe58
+Revises: e6ca88914008
+Create Date: 2026-10-19 19:00:16.432406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '981eee0dfe58'
+down_revision = 'e6ca88914008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('service_provider_id', sa.Integer(), nullable=True),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('event_log')
@@ -0,0 +1,40 @@
+"""Add structured weekly service hours
+
+Revision ID: a81d4c6f0b2e
+Revises: 3f9c2a7d5e41
+Create Date: 2026-10-19 10:41:27.093114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81d4c6f0b2e'
+down_revision = '3f9c2a7d5e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate existing rows afterwards with `python jobs.py backfill-hours`
+    op.create_table('service_hours',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Integer(), nullable=False),
+    sa.Column('opens', sa.Integer(), nullable=False),
+    sa.Column('closes', sa.Integer(), nullable=False),
+    sa.Column('service_provider_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['service_provider_id'], ['service_providers.id'], name=op.f('fk_service_hours_service_provider_id_service_providers'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('service_hours', schema=None) as batch_op:
+        batch_op.create_index('ix_service_hours_day_opens', ['day', 'opens', 'closes', 'service_provider_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_service_hours_service_provider_id'), ['service_provider_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('service_hours', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_service_hours_service_provider_id'))
+        batch_op.drop_index('ix_service_hours_day_opens')
+
+    op.drop_table('service_hours')
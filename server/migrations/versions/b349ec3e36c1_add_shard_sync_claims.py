@@ -0,0 +1,26 @@
+"""Add shard sync claims
+
+Revision ID: b349ec3e36c1
+Revises: 29ea13842620
+Create Date: 2026-10-19 19:27:50.908334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b349ec3e36c1'
+down_revision = '29ea13842620'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pending_shard_syncs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('pending_shard_syncs', schema=None) as batch_op:
+        batch_op.drop_column('claimed_until')
@@ -0,0 +1,38 @@
+"""Add precomputed similar providers
+
+Revision ID: c5e07b93d1f8
+Revises: a81d4c6f0b2e
+Create Date: 2026-10-19 11:58:03.667201
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e07b93d1f8'
+down_revision = 'a81d4c6f0b2e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate afterwards with `python jobs.py similar`
+    op.create_table('similar_providers',
+    sa.Column('service_provider_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('similar_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['service_provider_id'], ['service_providers.id'], name=op.f('fk_similar_providers_service_provider_id_service_providers'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['similar_id'], ['service_providers.id'], name=op.f('fk_similar_providers_similar_id_service_providers'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('service_provider_id', 'rank')
+    )
+    with op.batch_alter_table('similar_providers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_similar_providers_similar_id'), ['similar_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('similar_providers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_similar_providers_similar_id'))
+
+    op.drop_table('similar_providers')
@@ -0,0 +1,38 @@
+"""Add precomputed user recommendations
+
+Revision ID: e2b6f18c4a07
+Revises: c5e07b93d1f8
+Create Date: 2026-10-19 13:20:46.218390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6f18c4a07'
+down_revision = 'c5e07b93d1f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate afterwards with `python jobs.py recommendations`
+    op.create_table('user_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('service_provider_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['service_provider_id'], ['service_providers.id'], name=op.f('fk_user_recommendations_service_provider_id_service_providers'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_user_recommendations_user_id_users'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'rank')
+    )
+    with op.batch_alter_table('user_recommendations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_recommendations_service_provider_id'), ['service_provider_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_recommendations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_recommendations_service_provider_id'))
+
+    op.drop_table('user_recommendations')
@@ -0,0 +1,32 @@
+"""Index service providers by user and cover user review summaries
+
+Revision ID: e6ca88914008
+Revises: 0b7d35e9a6c2
+Create Date: 2026-10-19 18:44:33.027892
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6ca88914008'
+down_revision = '0b7d35e9a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_service_providers_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_user_id_rating', ['user_id', 'rating', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_user_id_rating')
+
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_service_providers_user_id'))
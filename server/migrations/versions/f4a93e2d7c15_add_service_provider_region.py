@@ -0,0 +1,28 @@
+"""Add service provider region
+
+Revision ID: f4a93e2d7c15
+Revises: e2b6f18c4a07
+Create Date: 2026-10-19 14:36:52.840117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a93e2d7c15'
+down_revision = 'e2b6f18c4a07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('region', sa.String(length=20), server_default='Ouest', nullable=False))
+        batch_op.create_index(batch_op.f('ix_service_providers_region'), ['region'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('service_providers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_service_providers_region'))
+        batch_op.drop_column('region')
@@ -3,6 +3,53 @@ from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import validates
 
 from config import db
+from hours import parse_hours
+from validation import REGIONS, USER_SCHEMA, SERVICE_PROVIDER_SCHEMA, REVIEW_SCHEMA
+
+
+def open_at_clause(providers, hours, moment):
+    """Providers open at a local datetime, answered from the service_hours index"""
+    minute = moment.hour * 60 + moment.minute
+    return providers.c.id.in_(
+        db.select(hours.c.service_provider_id).where(
+            hours.c.day == moment.weekday(),
+            hours.c.opens <= minute,
+            hours.c.closes > minute
+        )
+    )
+
+
+def provider_filters(providers, hours, category=None, search=None, region=None, moment=None):
+    """Listing conditions over the service_providers/service_hours tables.
+
+    Taking the tables as arguments lets regional shards reuse the same filters.
+    """
+    # Archived services are always hidden
+    conditions = [providers.c.archived_at.is_(None)]
+    if category:
+        conditions.append(providers.c.category == category)
+    if region:
+        conditions.append(providers.c.region == region)
+    if search:
+        # Search in name, description, or location
+        search_term = f"%{search}%"
+        conditions.append(db.or_(
+            providers.c.name.ilike(search_term),
+            providers.c.description.ilike(search_term),
+            providers.c.location.ilike(search_term)
+        ))
+    if moment:
+        conditions.append(open_at_clause(providers, hours, moment))
+    return conditions
+
+
+def plain_row(model, row):
+    """Format a Core row mapping like model.to_dict() would, without an ORM object"""
+    return {
+        key: value.strftime(model.datetime_format) if hasattr(value, 'strftime') else value
+        for key, value in row.items()
+        if key in model.serialize_only
+    }
 
 class User(db.Model, SerializerMixin):
     __tablename__ = 'users'
@@ -14,8 +61,9 @@ class User(db.Model, SerializerMixin):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationships
-    service_providers = db.relationship('ServiceProvider', back_populates='user', cascade='all, delete-orphan')
-    reviews = db.relationship('Review', back_populates='user', cascade='all, delete-orphan')
+    # Children are removed by ON DELETE CASCADE, not loaded and deleted one by one
+    service_providers = db.relationship('ServiceProvider', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
+    reviews = db.relationship('Review', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
     
     # Association proxy - get all service providers this user has reviewed
     reviewed_services = association_proxy('reviews', 'service_provider')
@@ -23,33 +71,10 @@ class User(db.Model, SerializerMixin):
     # Serialization rules - prevent infinite recursion
     serialize_only = ('id', 'name', 'email', 'created_at')
     
-    # Validations
-    @validates('name')
-    def validate_name(self, key, name):
-        if not name or len(name.strip()) < 2:
-            raise ValueError("Name must be at least 2 characters long")
-        if len(name) > 100:
-            raise ValueError("Name must be less than 100 characters")
-        return name.strip()
-    
-    @validates('email')
-    def validate_email(self, key, email):
-        if not email or '@' not in email:
-            raise ValueError("Must provide a valid email address")
-        if len(email) > 120:
-            raise ValueError("Email must be less than 120 characters")
-        return email.lower().strip()
-    
-    def to_dict_with_relations(self):
-        """Custom serialization with relationships"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'service_providers': [sp.to_dict() for sp in self.service_providers],
-            'reviews': [r.to_dict() for r in self.reviews]
-        }
+    # Validations (rules live in validation.USER_SCHEMA)
+    @validates('name', 'email')
+    def validate_fields(self, key, value):
+        return USER_SCHEMA.check(key, value)
     
     def __repr__(self):
         return f'<User {self.id}: {self.name}>'
@@ -66,69 +91,40 @@ class ServiceProvider(db.Model, SerializerMixin):
     location = db.Column(db.String(200), nullable=False)
     phone = db.Column(db.String(20))
     hours = db.Column(db.String(100))
+    region = db.Column(db.String(20), nullable=False, server_default='Ouest', index=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    archived_at = db.Column(db.DateTime)
     
     # Foreign Keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Relationships
     user = db.relationship('User', back_populates='service_providers')
-    reviews = db.relationship('Review', back_populates='service_provider', cascade='all, delete-orphan')
+    reviews = db.relationship('Review', back_populates='service_provider', cascade='all, delete-orphan', passive_deletes=True)
+    opening_hours = db.relationship('ServiceHours', back_populates='service_provider', cascade='all, delete-orphan', passive_deletes=True)
     
     # Association proxy - get all users who reviewed this service
     reviewers = association_proxy('reviews', 'user')
     
     # Serialization rules - prevent infinite recursion
-    serialize_only = ('id', 'name', 'category', 'description', 'location', 'phone', 'hours', 'created_at', 'user_id')
-    
-    # Validations
-    @validates('name')
-    def validate_name(self, key, name):
-        if not name or len(name.strip()) < 3:
-            raise ValueError("Service name must be at least 3 characters long")
-        if len(name) > 150:
-            raise ValueError("Service name must be less than 150 characters")
-        return name.strip()
-    
-    @validates('category')
-    def validate_category(self, key, category):
-        valid_categories = [
-            'Medical/Health',
-            'Education',
-            'Water & Sanitation',
-            'Community Centers',
-            'Emergency Services'
-        ]
-        if category not in valid_categories:
-            raise ValueError(f"Category must be one of: {', '.join(valid_categories)}")
-        return category
-    
-    @validates('description')
-    def validate_description(self, key, description):
-        if not description or len(description.strip()) < 10:
-            raise ValueError("Description must be at least 10 characters long")
-        if len(description) > 1000:
-            raise ValueError("Description must be less than 1000 characters")
-        return description.strip()
-    
-    @validates('location')
-    def validate_location(self, key, location):
-        if not location or len(location.strip()) < 5:
-            raise ValueError("Location must be at least 5 characters long")
-        if len(location) > 200:
-            raise ValueError("Location must be less than 200 characters")
-        return location.strip()
-    
-    @validates('phone')
-    def validate_phone(self, key, phone):
-        if phone:
-            # Remove spaces and dashes for validation
-            clean_phone = phone.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-            if not clean_phone.isdigit():
-                raise ValueError("Phone number must contain only digits, spaces, dashes, or parentheses")
-            if len(clean_phone) < 8 or len(clean_phone) > 15:
-                raise ValueError("Phone number must be between 8 and 15 digits")
-        return phone
+    serialize_only = ('id', 'name', 'category', 'description', 'location', 'phone', 'hours', 'region', 'created_at', 'archived_at', 'user_id')
+    
+    # Validations (rules live in validation.SERVICE_PROVIDER_SCHEMA)
+    @validates('name', 'category', 'region', 'description', 'location', 'phone')
+    def validate_fields(self, key, value):
+        return SERVICE_PROVIDER_SCHEMA.check(key, value)
+    
+    @validates('hours')
+    def validate_hours(self, key, hours):
+        hours = SERVICE_PROVIDER_SCHEMA.check(key, hours)
+        # Keep the structured weekly intervals in step with the free text
+        self.opening_hours = ServiceHours.from_text(hours)
+        return hours
+    
+    @classmethod
+    def open_at(cls, moment):
+        """Filter for services open at a local datetime"""
+        return open_at_clause(cls.__table__, ServiceHours.__table__, moment)
     
     def to_dict_with_reviews(self):
         """Custom serialization with reviews"""
@@ -140,7 +136,9 @@ class ServiceProvider(db.Model, SerializerMixin):
             'location': self.location,
             'phone': self.phone,
             'hours': self.hours,
+            'region': self.region,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
             'user_id': self.user_id,
             'user': {
                 'id': self.user.id,
@@ -157,6 +155,10 @@ class ServiceProvider(db.Model, SerializerMixin):
 
 class Review(db.Model, SerializerMixin):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Covers the per-user summary (count, average rating, latest review)
+        db.Index('ix_reviews_user_id_rating', 'user_id', 'rating', 'created_at'),
+    )
     
     # Columns
     id = db.Column(db.Integer, primary_key=True)
@@ -165,8 +167,8 @@ class Review(db.Model, SerializerMixin):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Foreign Keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Relationships
     user = db.relationship('User', back_populates='reviews')
@@ -175,22 +177,10 @@ class Review(db.Model, SerializerMixin):
     # Serialization rules - prevent infinite recursion
     serialize_only = ('id', 'rating', 'comment', 'created_at', 'user_id', 'service_provider_id')
     
-    # Validations
-    @validates('rating')
-    def validate_rating(self, key, rating):
-        if not isinstance(rating, int):
-            raise ValueError("Rating must be an integer")
-        if rating < 1 or rating > 5:
-            raise ValueError("Rating must be between 1 and 5")
-        return rating
-    
-    @validates('comment')
-    def validate_comment(self, key, comment):
-        if not comment or len(comment.strip()) < 5:
-            raise ValueError("Comment must be at least 5 characters long")
-        if len(comment) > 500:
-            raise ValueError("Comment must be less than 500 characters")
-        return comment.strip()
+    # Validations (rules live in validation.REVIEW_SCHEMA)
+    @validates('rating', 'comment')
+    def validate_fields(self, key, value):
+        return REVIEW_SCHEMA.check(key, value)
     
     def to_dict_with_relations(self):
         """Custom serialization with user and service info"""
@@ -212,4 +202,126 @@ class Review(db.Model, SerializerMixin):
         }
     
     def __repr__(self):
-        return f'<Review {self.id}: {self.rating} stars>'
\ No newline at end of file
+        return f'<Review {self.id}: {self.rating} stars>'
+
+
+class ServiceHours(db.Model, SerializerMixin):
+    __tablename__ = 'service_hours'
+    __table_args__ = (
+        # Covers the open-at lookup: equality on day, range on opens
+        db.Index('ix_service_hours_day_opens', 'day', 'opens', 'closes', 'service_provider_id'),
+    )
+    
+    # Columns (day is Monday=0, opens/closes are minutes since midnight)
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Integer, nullable=False)
+    opens = db.Column(db.Integer, nullable=False)
+    closes = db.Column(db.Integer, nullable=False)
+    
+    # Foreign Keys
+    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    # Relationships
+    service_provider = db.relationship('ServiceProvider', back_populates='opening_hours')
+    
+    # Serialization rules - prevent infinite recursion
+    serialize_only = ('day', 'opens', 'closes')
+    
+    @classmethod
+    def from_text(cls, hours):
+        return [cls(day=day, opens=opens, closes=closes) for day, opens, closes in parse_hours(hours)]
+    
+    def __repr__(self):
+        return f'<ServiceHours {self.service_provider_id}: {self.day} {self.opens}-{self.closes}>'
+
+
+class SimilarProvider(db.Model, SerializerMixin):
+    __tablename__ = 'similar_providers'
+    
+    # Columns (precomputed by `python jobs.py similar`)
+    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    similar_id = db.Column(db.Integer, db.ForeignKey('service_providers.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    
+    # Serialization rules - prevent infinite recursion
+    serialize_only = ('similar_id', 'rank', 'score')
+    
+    def __repr__(self):
+        return f'<SimilarProvider {self.service_provider_id} -> {self.similar_id}: {self.score}>'
+
+
+class UserRecommendation(db.Model, SerializerMixin):
+    __tablename__ = 'user_recommendations'
+    
+    # Columns (precomputed by `python jobs.py recommendations`)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    
+    # Serialization rules - prevent infinite recursion
+    serialize_only = ('service_provider_id', 'rank', 'score')
+    
+    def __repr__(self):
+        return f'<UserRecommendation {self.user_id} -> {self.service_provider_id}: {self.score}>'
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # Columns (status_code/body stay NULL while the first request runs)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    mimetype = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key}: {self.status_code}>'
+
+
+class EventLog(db.Model):
+    __tablename__ = 'event_log'
+    # Ids are never reused, so they stay valid as Last-Event-ID after pruning
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    # Columns (data is the event's JSON, serialized once)
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    service_provider_id = db.Column(db.Integer)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<EventLog {self.id}: {self.event_type}>'
+
+
+class PendingShardSync(db.Model):
+    __tablename__ = 'pending_shard_syncs'
+    
+    # Columns (review_id is NULL when the whole provider must be copied)
+    id = db.Column(db.Integer, primary_key=True)
+    service_provider_id = db.Column(db.Integer, nullable=False)
+    review_id = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    available_at = db.Column(db.DateTime, nullable=False, index=True)
+    # Set while a worker is copying the provider (see ShardRouter.reconcile)
+    claimed_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<PendingShardSync {self.service_provider_id}/{self.review_id}: {self.attempts} attempts>'
+
+
+class ShardPlacement(db.Model):
+    __tablename__ = 'shard_placements'
+    
+    # The region whose shard holds the provider's copy
+    service_provider_id = db.Column(db.Integer, primary_key=True)
+    region = db.Column(db.String(50), nullable=False)
+    
+    def __repr__(self):
+        return f'<ShardPlacement {self.service_provider_id}: {self.region}>'
@@ -0,0 +1,84 @@
+import threading
+
+from models import db, ServiceProvider
+
+
+class ProviderReadModel:
+    """In-memory read model for GET /api/service-providers.
+
+    Enabled by READ_MODEL_ENABLED. Listings with category, search and region
+    filters are answered from the current Snapshot (snapshot.py) with no SQL and no ORM
+    objects. Readers take a reference to the snapshot and never lock; writers
+    build a new snapshot and swap the reference. The snapshot is loaded once
+    (in the gunicorn master, or on first use) and then follows the event
+    log: every provider event, from any worker process, patches it as it
+    reaches this process's broker, so there is no periodic full reload.
+    """
+
+    def __init__(self, app=None, events=None):
+        self.snapshot = None
+        self.enabled = False
+        # Newest event id already reflected in the snapshot
+        self.loaded_through = 0
+        # Serializes writers (loads and patches); readers never take it
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, events)
+
+    def init_app(self, app, events=None):
+        app.config.setdefault('READ_MODEL_ENABLED', False)
+        self.app = app
+        self.events = events
+        self.enabled = app.config['READ_MODEL_ENABLED']
+        if self.enabled and events is not None:
+            events.follow(self.on_event)
+
+    def _load(self):
+        # Imported here so numpy is only needed when the read model is enabled
+        from snapshot import Snapshot
+
+        # Read before the rows: a later event may be applied twice, never missed
+        loaded_through = self.events.head() if self.events is not None else 0
+        table = ServiceProvider.__table__
+        rows = db.session.execute(
+            db.select(table).where(table.c.archived_at.is_(None)).order_by(table.c.id)
+        ).mappings()
+        self.snapshot = Snapshot.from_rows(rows)
+        self.loaded_through = loaded_through
+        return self.snapshot
+
+    def rebuild(self):
+        """Load every listed provider into a fresh snapshot and swap it in"""
+        with self.lock:
+            return self._load()
+
+    def current(self):
+        """The snapshot to serve, loading it on first use"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.lock:
+                return self.snapshot or self._load()
+        return snapshot
+
+    def on_event(self, event_id, event_type, service_provider_id):
+        if self.snapshot is None or event_id <= self.loaded_through:
+            return
+        if self.events.floor_id > self.loaded_through:
+            # Events between the load and this process's first poll were never
+            # received (more than a buffer's worth): start over
+            with self.app.app_context():
+                self.rebuild()
+        elif event_type.startswith('service_provider.'):
+            self.patch(service_provider_id)
+
+    def patch(self, provider_id):
+        """Copy one provider's committed state into a new snapshot"""
+        table = ServiceProvider.__table__
+        query = db.select(table).where(table.c.id == provider_id, table.c.archived_at.is_(None))
+        with self.lock:
+            if self.snapshot is None:
+                return
+            # Read under the lock, so a slower patch cannot swap in an older row
+            with db.engine.connect() as connection:
+                row = connection.execute(query).mappings().first()
+            self.snapshot = self.snapshot.replace(provider_id, row)
@@ -0,0 +1,132 @@
+import multiprocessing
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+from models import db, Review, ServiceProvider, UserRecommendation
+
+
+# Reviews fetched per round trip while building the rating matrix
+BATCH_SIZE = 50000
+
+# Set in each worker process by _init_worker
+_user_factors = None
+_item_factors = None
+_reviewed = None
+_excluded = None
+
+
+def load_ratings(batch_size=BATCH_SIZE):
+    """Return (user ids, provider ids, ratings) as compact arrays, streamed from the database"""
+    users, providers, ratings = [], [], []
+    statement = db.select(Review.user_id, Review.service_provider_id, Review.rating).execution_options(
+        stream_results=True, yield_per=batch_size
+    )
+    for chunk in db.session.execute(statement).partitions():
+        users.append(np.fromiter((row[0] for row in chunk), dtype=np.int32, count=len(chunk)))
+        providers.append(np.fromiter((row[1] for row in chunk), dtype=np.int32, count=len(chunk)))
+        ratings.append(np.fromiter((row[2] for row in chunk), dtype=np.float32, count=len(chunk)))
+    if not users:
+        empty = np.array([], dtype=np.int32)
+        return empty, empty, np.array([], dtype=np.float32)
+    return np.concatenate(users), np.concatenate(providers), np.concatenate(ratings)
+
+
+def rating_matrix(user_ids, provider_ids, ratings):
+    """Sparse user x provider matrix of ratings centered on each user's mean"""
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    providers, provider_index = np.unique(provider_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (ratings, (user_index, provider_index)),
+        shape=(len(users), len(providers)), dtype=np.float32
+    )
+    # Repeat reviews of the same provider are averaged
+    counts = sparse.csr_matrix(
+        (np.ones_like(ratings), (user_index, provider_index)),
+        shape=matrix.shape, dtype=np.float32
+    )
+    matrix.data /= counts.data
+
+    means = np.asarray(matrix.sum(axis=1)).ravel() / np.maximum(np.diff(matrix.indptr), 1)
+    matrix.data -= np.repeat(means, np.diff(matrix.indptr)).astype(np.float32)
+    # Keep structural zeros for ratings equal to the mean so they are still excluded
+    matrix.data[matrix.data == 0] = 1e-6
+    return users, providers, matrix
+
+
+def factorize(matrix, factors):
+    """Truncated SVD: user factors scaled by singular values, and item factors"""
+    factors = min(factors, min(matrix.shape) - 1)
+    if factors < 1:
+        return None, None
+    u, s, vt = svds(matrix, k=factors)
+    return (u * s).astype(np.float32), vt.T.astype(np.float32)
+
+
+def _init_worker(user_factors, item_factors, reviewed, excluded):
+    global _user_factors, _item_factors, _reviewed, _excluded
+    _user_factors, _item_factors, _reviewed, _excluded = user_factors, item_factors, reviewed, excluded
+
+
+def _score_block(bounds):
+    """Top-n providers for users[start:end] that they have not reviewed"""
+    start, end, n = bounds
+    scores = _user_factors[start:end] @ _item_factors.T
+    scores[:, _excluded] = -np.inf
+    for i in range(end - start):
+        row = start + i
+        scores[i, _reviewed.indices[_reviewed.indptr[row]:_reviewed.indptr[row + 1]]] = -np.inf
+    n = min(n, scores.shape[1])
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return start, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def refresh_recommendations(n=10, factors=32, workers=None, memory_mb=256, batch_size=5000):
+    """Factorize the review matrix and store the top-n unreviewed providers per user.
+
+    Users are scored in blocks sized so one block's dense score matrix fits
+    in memory_mb, spread across worker processes.
+    """
+    user_ids, provider_ids, ratings = load_ratings()
+    if not len(ratings):
+        return 0
+    users, providers, matrix = rating_matrix(user_ids, provider_ids, ratings)
+    del user_ids, provider_ids, ratings
+    user_factors, item_factors = factorize(matrix, factors)
+    if user_factors is None:
+        return 0
+
+    # Never recommend archived providers
+    archived = db.session.execute(
+        db.select(ServiceProvider.id).where(ServiceProvider.archived_at.is_not(None))
+    ).scalars().all()
+    excluded = np.isin(providers, archived)
+
+    block = max(1, memory_mb * 1024 * 1024 // (4 * len(providers)))
+    blocks = [(start, min(start + block, len(users)), n) for start in range(0, len(users), block)]
+
+    db.session.execute(db.delete(UserRecommendation))
+    pending = []
+    with multiprocessing.Pool(workers, _init_worker, (user_factors, item_factors, matrix, excluded)) as pool:
+        for start, top, scores in pool.imap_unordered(_score_block, blocks):
+            for i in range(len(top)):
+                pending.extend(
+                    {
+                        'user_id': int(users[start + i]),
+                        'rank': rank,
+                        'service_provider_id': int(providers[column]),
+                        'score': round(float(score), 4),
+                    }
+                    for rank, (column, score) in enumerate(zip(top[i], scores[i]))
+                    if np.isfinite(score)
+                )
+            if len(pending) >= batch_size:
+                db.session.execute(db.insert(UserRecommendation.__table__), pending)
+                pending = []
+    if pending:
+        db.session.execute(db.insert(UserRecommendation.__table__), pending)
+    db.session.commit()
+    return len(users)
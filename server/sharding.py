@@ -0,0 +1,293 @@
+import logging
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
+
+import sqlalchemy as sa
+
+from models import (
+    db, REGIONS, ServiceProvider, ServiceHours, Review, PendingShardSync, ShardPlacement,
+    provider_filters, plain_row,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def region_slug(region):
+    """"Grand'Anse" -> "grand_anse", for shard database names"""
+    text = unicodedata.normalize('NFKD', region.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z]+', '_', text).strip('_')
+
+
+def _shard_table(table, metadata):
+    """Copy a table into the shard schema, minus foreign keys to the central users table"""
+    columns = []
+    for column in table.columns:
+        foreign_keys = [
+            sa.ForeignKey(fk.target_fullname, ondelete=fk.ondelete)
+            for fk in column.foreign_keys
+            if not fk.target_fullname.startswith('users.')
+        ]
+        server_default = sa.DefaultClause(column.server_default.arg) if column.server_default else None
+        columns.append(sa.Column(
+            column.name, column.type, *foreign_keys,
+            primary_key=column.primary_key, nullable=column.nullable, server_default=server_default
+        ))
+    indexes = [sa.Index(index.name, *[column.name for column in index.columns]) for index in table.indexes]
+    return sa.Table(table.name, metadata, *columns, *indexes)
+
+
+class ShardRouter:
+    """Per-département databases for service providers, their hours and reviews.
+
+    Enabled by SHARD_URL_TEMPLATE (e.g. "sqlite:////var/lib/konekte/{region}.db").
+    The central database stays the system of record and keeps users; each
+    committed write is queued in pending_shard_syncs and a background thread
+    copies the affected provider or review to the shard for its region, so
+    listing queries with a region touch one small database and queries
+    without one fan out to all shards in parallel. Failed copies stay queued
+    and are retried with exponential backoff (see reconcile).
+    """
+
+    def __init__(self, app=None, events=None):
+        self.engines = {}
+        self.worker_pid = None
+        self.start_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        if app is not None:
+            self.init_app(app, events)
+
+    def init_app(self, app, events=None):
+        app.config.setdefault('SHARD_URL_TEMPLATE', None)
+        app.config.setdefault('SHARD_SYNC_INTERVAL', 5.0)
+        app.config.setdefault('SHARD_SYNC_MAX_BACKOFF', 300)
+        # Longer than any one provider's copy may take
+        app.config.setdefault('SHARD_SYNC_LEASE', 60)
+        template = app.config['SHARD_URL_TEMPLATE']
+        if not template:
+            return
+
+        self.app = app
+        self.sync_interval = app.config['SHARD_SYNC_INTERVAL']
+        self.max_backoff = app.config['SHARD_SYNC_MAX_BACKOFF']
+        self.lease = app.config['SHARD_SYNC_LEASE']
+
+        self.metadata = sa.MetaData(naming_convention=db.metadata.naming_convention)
+        self.providers = _shard_table(ServiceProvider.__table__, self.metadata)
+        self.hours = _shard_table(ServiceHours.__table__, self.metadata)
+        self.reviews = _shard_table(Review.__table__, self.metadata)
+        for region in REGIONS:
+            engine = sa.create_engine(template.format(region=region_slug(region)))
+            self.metadata.create_all(engine)
+            self.engines[region] = engine
+        self.executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix='shard')
+        if events is not None:
+            events.listen(self.on_event)
+
+    @property
+    def enabled(self):
+        return bool(self.engines)
+
+    # Reads
+
+    def fetch(self, statement, region=None):
+        """Rows of statement from one region's shard, or from every shard in parallel"""
+        def run(engine):
+            with engine.connect() as connection:
+                return connection.execute(statement).mappings().all()
+
+        if region:
+            return run(self.engines[region]) if region in self.engines else []
+        return list(chain.from_iterable(self.executor.map(run, self.engines.values())))
+
+    def service_providers(self, region=None, **filters):
+        statement = sa.select(self.providers).where(
+            *provider_filters(self.providers, self.hours, region=region, **filters)
+        )
+        rows = sorted(self.fetch(statement, region), key=lambda row: row['id'])
+        return [plain_row(ServiceProvider, row) for row in rows]
+
+    def reviews_for(self, region=None, service_provider_id=None):
+        statement = sa.select(self.reviews)
+        if service_provider_id:
+            statement = statement.where(self.reviews.c.service_provider_id == service_provider_id)
+        rows = sorted(self.fetch(statement, region), key=lambda row: row['id'])
+        return [plain_row(Review, row) for row in rows]
+
+    # Writes, queued at commit and copied from the central database in the background
+
+    def on_event(self, event_type, data, service_provider_id):
+        if event_type.startswith('service_provider.'):
+            self.enqueue(service_provider_id)
+        elif event_type.startswith('review.'):
+            self.enqueue(service_provider_id, data['id'])
+
+    def enqueue(self, provider_id, review_id=None):
+        """Queue a provider (or one of its reviews) for copying and wake the sync thread"""
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            connection.execute(sa.insert(PendingShardSync.__table__).values(
+                service_provider_id=provider_id, review_id=review_id, attempts=0,
+                available_at=now, created_at=now,
+            ))
+        self._start_worker()
+        self.wakeup.set()
+
+    def _start_worker(self):
+        # Threads do not survive fork: start one per process, on first use
+        if self.worker_pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.worker_pid == os.getpid():
+                return
+            self.wakeup = threading.Event()
+            threading.Thread(target=self._run_worker, name='shard-sync', daemon=True).start()
+            self.worker_pid = os.getpid()
+
+    def _run_worker(self):
+        with self.app.app_context():
+            while True:
+                self.wakeup.wait(self.sync_interval)
+                self.wakeup.clear()
+                try:
+                    self.reconcile()
+                except Exception:
+                    logger.exception("Shard sync failed")
+                finally:
+                    db.session.remove()
+
+    def reconcile(self, limit=500):
+        """Copy queued writes whose retry time has come; returns (synced, failed) providers.
+
+        Every worker runs this over the same queue, so a worker first claims
+        all of a provider's due entries with a conditional update, which
+        fails while another worker holds a lease on that provider. Copies of
+        one provider are therefore never interleaved, and an entry queued
+        during a copy waits for the next round. A lease left by a worker that
+        died expires after SHARD_SYNC_LEASE seconds.
+
+        A copy reads the current central state, so one success clears every
+        claimed entry. A failure keeps them and delays their next attempt by
+        1, 2, 4... seconds, up to SHARD_SYNC_MAX_BACKOFF.
+        """
+        queue = PendingShardSync.__table__
+        now = datetime.utcnow()
+        unclaimed = sa.or_(queue.c.claimed_until.is_(None), queue.c.claimed_until <= now)
+        provider_ids = db.session.execute(
+            sa.select(queue.c.service_provider_id)
+            .where(queue.c.available_at <= now, unclaimed)
+            .group_by(queue.c.service_provider_id)
+            .order_by(sa.func.min(queue.c.id)).limit(limit)
+        ).scalars().all()
+        db.session.commit()
+        synced = failed = 0
+        for provider_id in provider_ids:
+            entries = self._claim(provider_id)
+            if not entries:
+                # Another worker holds it
+                continue
+            mine = queue.c.id.in_([entry.id for entry in entries])
+            try:
+                if any(entry.review_id is None for entry in entries):
+                    self.sync_provider(provider_id)
+                for review_id in sorted({entry.review_id for entry in entries} - {None}):
+                    self.sync_review(review_id, provider_id)
+            except Exception as e:
+                db.session.rollback()
+                for entry in entries:
+                    delay = min(self.max_backoff, 2 ** entry.attempts)
+                    db.session.execute(sa.update(queue).where(queue.c.id == entry.id).values(
+                        attempts=entry.attempts + 1, last_error=repr(e)[:1000], claimed_until=None,
+                        available_at=datetime.utcnow() + timedelta(seconds=delay),
+                    ))
+                db.session.commit()
+                logger.warning("Shard sync of provider %s failed, retrying: %r", provider_id, e)
+                failed += 1
+                continue
+            db.session.execute(sa.delete(queue).where(mine))
+            db.session.commit()
+            synced += 1
+        return synced, failed
+
+    def _claim(self, provider_id):
+        """Lease a provider's due queue entries to this worker; returns them, or [] if another worker holds it"""
+        queue = PendingShardSync.__table__
+        other = queue.alias()
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease)
+        claimed = db.session.execute(sa.update(queue).where(
+            queue.c.service_provider_id == provider_id,
+            queue.c.available_at <= now,
+            sa.or_(queue.c.claimed_until.is_(None), queue.c.claimed_until <= now),
+            ~sa.exists().where(other.c.service_provider_id == provider_id, other.c.claimed_until > now),
+        ).values(claimed_until=lease)).rowcount
+        entries = db.session.execute(sa.select(queue).where(
+            queue.c.service_provider_id == provider_id, queue.c.claimed_until == lease,
+        ).order_by(queue.c.id)).all() if claimed else []
+        db.session.commit()
+        return entries
+
+    def _central(self, table, *conditions):
+        return [dict(row) for row in db.session.execute(sa.select(table).where(*conditions)).mappings()]
+
+    def sync_provider(self, provider_id, full=False):
+        """Copy one provider (and its hours) to its region's shard and remove it from the shard it left.
+
+        The shard holding each provider is recorded in shard_placements, so
+        a write touches one shard, or two when the provider changes region.
+        With full=True every other shard is cleared too (for `jobs.py shard-sync`).
+        """
+        providers = self._central(ServiceProvider.__table__, ServiceProvider.id == provider_id)
+        provider = providers[0] if providers else None
+        region = provider['region'] if provider else None
+        placements = ShardPlacement.__table__
+        placed = db.session.execute(
+            sa.select(placements.c.region).where(placements.c.service_provider_id == provider_id)
+        ).scalar()
+        stale = set(self.engines) - {region} if full else {placed} & set(self.engines) - {region}
+
+        for old_region in stale:
+            with self.engines[old_region].begin() as connection:
+                # Cascades to the provider's hours and reviews in this shard
+                connection.execute(sa.delete(self.providers).where(self.providers.c.id == provider_id))
+
+        if region in self.engines:
+            with self.engines[region].begin() as connection:
+                updated = connection.execute(
+                    sa.update(self.providers).where(self.providers.c.id == provider_id).values(**provider)
+                ).rowcount
+                if not updated:
+                    # New to this shard (created, or moved from another region)
+                    connection.execute(sa.insert(self.providers), [provider])
+                    reviews = self._central(Review.__table__, Review.service_provider_id == provider_id)
+                    if reviews:
+                        connection.execute(sa.insert(self.reviews), reviews)
+
+                connection.execute(sa.delete(self.hours).where(self.hours.c.service_provider_id == provider_id))
+                hours = self._central(ServiceHours.__table__, ServiceHours.service_provider_id == provider_id)
+                if hours:
+                    connection.execute(sa.insert(self.hours), hours)
+
+        if placed != region:
+            db.session.execute(sa.delete(placements).where(placements.c.service_provider_id == provider_id))
+            if region in self.engines:
+                db.session.execute(sa.insert(placements).values(service_provider_id=provider_id, region=region))
+        db.session.commit()
+
+    def sync_review(self, review_id, provider_id):
+        region = db.session.execute(
+            sa.select(ServiceProvider.region).where(ServiceProvider.id == provider_id)
+        ).scalar()
+        if region not in self.engines:
+            return
+        reviews = self._central(Review.__table__, Review.id == review_id)
+        with self.engines[region].begin() as connection:
+            connection.execute(sa.delete(self.reviews).where(self.reviews.c.id == review_id))
+            if reviews:
+                connection.execute(sa.insert(self.reviews), reviews)
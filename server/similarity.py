@@ -0,0 +1,152 @@
+import re
+import unicodedata
+
+import numpy as np
+from scipy import sparse
+
+from models import db, ServiceProvider, SimilarProvider
+
+
+# Frequent French/Kreyòl words that say nothing about the service
+STOPWORDS = {
+    'de', 'des', 'du', 'la', 'le', 'les', 'et', 'en', 'un', 'une', 'pour', 'par',
+    'au', 'aux', 'avec', 'sur', 'dans', 'pres', 'ak', 'pou', 'nan', 'yo', 'ki',
+}
+TOKEN = re.compile(r'[a-z0-9]{2,}')
+
+# Score weights: name/description text, location text, same category
+TEXT_WEIGHT = 0.7
+LOCATION_WEIGHT = 0.2
+CATEGORY_WEIGHT = 0.1
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [token for token in TOKEN.findall(text) if token not in STOPWORDS]
+
+
+def _top_terms(matrix, max_terms):
+    """Keep only the max_terms heaviest entries of each CSR row"""
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    order = np.lexsort((-matrix.data, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = order[rank < max_terms]
+    return sparse.csr_matrix(
+        (matrix.data[keep], (rows[keep], matrix.indices[keep])),
+        shape=matrix.shape
+    )
+
+
+def tfidf(documents, max_df=0.5, max_terms=16):
+    """L2-normalized sublinear TF-IDF rows as a CSR matrix.
+
+    Terms in more than max_df of the documents are dropped and each row keeps
+    only its max_terms heaviest terms, which keeps the similarity products
+    sparse on large corpora.
+    """
+    vocabulary = {}
+    indptr, indices, counts = [0], [], []
+    for document in documents:
+        row = {}
+        for token in tokenize(document):
+            column = vocabulary.setdefault(token, len(vocabulary))
+            row[column] = row.get(column, 0) + 1
+        indices.extend(row)
+        counts.extend(row.values())
+        indptr.append(len(indices))
+
+    n = len(documents)
+    matrix = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float32), indices, indptr),
+        shape=(n, len(vocabulary))
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    df = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1
+    if n >= 20:
+        idf[df > max_df * n] = 0
+    matrix = _top_terms((matrix @ sparse.diags(idf)).tocsr(), max_terms)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+    matrix.eliminate_zeros()
+    return matrix.tocsr()
+
+
+def nearest(text, location, categories, rows, k, block=256):
+    """Yield (row, neighbor rows, scores) with the top-k neighbors of each row.
+
+    Candidates are rows sharing a text or location term; sharing the
+    category only adds to their score.
+    """
+    text_t = text.T.tocsr()
+    location_t = location.T.tocsr()
+    for start in range(0, len(rows), block):
+        batch = rows[start:start + block]
+        scores = (TEXT_WEIGHT * (text[batch] @ text_t)
+                  + LOCATION_WEIGHT * (location[batch] @ location_t)).tocsr()
+        for i, row in enumerate(batch):
+            begin, end = scores.indptr[i], scores.indptr[i + 1]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end] + CATEGORY_WEIGHT * (categories[columns] == categories[row])
+            keep = columns != row
+            columns, values = columns[keep], values[keep]
+            if len(values) > k:
+                top = np.argpartition(-values, k)[:k]
+                columns, values = columns[top], values[top]
+            order = np.argsort(-values, kind='stable')
+            yield row, columns[order], values[order]
+
+
+def refresh_similar(k=10, incremental=False, batch_size=5000):
+    """Precompute top-k similar providers into similar_providers.
+
+    A full run rebuilds every list. An incremental run only fills providers
+    that have no list yet: new ones, and ones whose list was dropped when
+    their text changed.
+    """
+    services = db.session.execute(
+        db.select(
+            ServiceProvider.id, ServiceProvider.name, ServiceProvider.category,
+            ServiceProvider.description, ServiceProvider.location
+        ).where(ServiceProvider.archived_at.is_(None)).order_by(ServiceProvider.id)
+    ).all()
+    if not services:
+        return 0
+    ids = np.array([service.id for service in services])
+
+    text = tfidf([f'{s.name} {s.description}' for s in services], max_df=0.1)
+    location = tfidf([s.location for s in services])
+    categories = np.array([s.category for s in services])
+
+    if incremental:
+        done = set(db.session.execute(
+            db.select(SimilarProvider.service_provider_id).distinct()
+        ).scalars())
+        rows = [row for row, service_id in enumerate(ids) if service_id not in done]
+    else:
+        db.session.execute(db.delete(SimilarProvider))
+        rows = list(range(len(ids)))
+
+    pending = []
+    for row, neighbors, scores in nearest(text, location, categories, rows, k):
+        pending.extend(
+            {
+                'service_provider_id': int(ids[row]),
+                'rank': rank,
+                'similar_id': int(ids[neighbor]),
+                'score': round(float(score), 4),
+            }
+            for rank, (neighbor, score) in enumerate(zip(neighbors, scores))
+            if score > 0
+        )
+        if len(pending) >= batch_size:
+            db.session.execute(db.insert(SimilarProvider.__table__), pending)
+            pending = []
+    if pending:
+        db.session.execute(db.insert(SimilarProvider.__table__), pending)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,133 @@
+import json
+import sys
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+from models import ServiceProvider, plain_row
+
+
+# Row separator in the search haystack, and field separator within a row, so
+# a search term never matches across two providers or two fields
+ROW_SEP = '\x00'
+FIELD_SEP = '\x01'
+
+
+def _codes(values):
+    """Sorted distinct values and each row's index into them"""
+    names = sorted(set(values))
+    codes = np.searchsorted(np.array(names, dtype=object), np.array(values, dtype=object)) if values else []
+    return names, np.asarray(codes, dtype=np.uint8)
+
+
+def _bitmaps(codes, count):
+    """One packed bitmap (1 bit per row) for each distinct code"""
+    return {code: np.packbits(codes == code) for code in range(count)}
+
+
+class Snapshot:
+    """Immutable, column-oriented copy of every listed (unarchived) provider.
+
+    Rows are ordered by id. Each provider is kept as its pre-encoded JSON,
+    its lowercased search text (all rows joined into one string) and small
+    integer codes for category and region with a packed bitmap per value.
+    Snapshots are never modified: a write produces a new one.
+    """
+
+    def __init__(self, ids, categories, regions, texts, payloads):
+        self.size = len(ids)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.payloads = payloads
+        self.haystack = ROW_SEP.join(texts)
+        # Start of each row in the haystack
+        self.offsets = array('q', [0] * self.size)
+        position = 0
+        for row, text in enumerate(texts):
+            self.offsets[row] = position
+            position += len(text) + 1
+
+        self.category_names, self.category_codes = _codes(categories)
+        self.region_names, self.region_codes = _codes(regions)
+        self.category_bitmaps = _bitmaps(self.category_codes, len(self.category_names))
+        self.region_bitmaps = _bitmaps(self.region_codes, len(self.region_names))
+
+    @staticmethod
+    def columns_for(row):
+        """(id, category, region, search text, JSON) for one service_providers row"""
+        text = FIELD_SEP.join((row['name'] or '', row['description'] or '', row['location'] or ''))
+        return (
+            row['id'], row['category'], row['region'],
+            text.replace(ROW_SEP, ' ').lower(),
+            json.dumps(plain_row(ServiceProvider, row), sort_keys=True),
+        )
+
+    @classmethod
+    def from_rows(cls, rows):
+        columns = [cls.columns_for(row) for row in rows]
+        if not columns:
+            return cls([], [], [], [], [])
+        ids, categories, regions, texts, payloads = (list(column) for column in zip(*columns))
+        return cls(ids, categories, regions, texts, payloads)
+
+    def replace(self, provider_id, row):
+        """A new snapshot with provider_id replaced by row, or removed when row is None"""
+        ids = self.ids.tolist()
+        categories = [self.category_names[code] for code in self.category_codes]
+        regions = [self.region_names[code] for code in self.region_codes]
+        texts = self.haystack.split(ROW_SEP) if self.size else []
+        payloads = list(self.payloads)
+        columns = (ids, categories, regions, texts, payloads)
+
+        index = int(np.searchsorted(self.ids, provider_id))
+        if index < self.size and ids[index] == provider_id:
+            for column in columns:
+                del column[index]
+        if row is not None:
+            for column, value in zip(columns, self.columns_for(row)):
+                column.insert(index, value)
+        return Snapshot(*columns)
+
+    def _search(self, term):
+        """Rows whose name, description or location contains term (lowercased)"""
+        rows = []
+        find = self.haystack.find
+        position = find(term)
+        while position != -1:
+            row = bisect_right(self.offsets, position) - 1
+            rows.append(row)
+            if row + 1 >= self.size:
+                break
+            position = find(term, self.offsets[row + 1])
+        return np.array(rows, dtype=np.int64)
+
+    def select(self, category=None, search=None, region=None):
+        """Row positions matching the listing filters, in id order"""
+        bits = None
+        for bitmaps, names, value in ((self.category_bitmaps, self.category_names, category),
+                                      (self.region_bitmaps, self.region_names, region)):
+            if not value:
+                continue
+            if value not in names:
+                return np.array([], dtype=np.int64)
+            bitmap = bitmaps[names.index(value)]
+            bits = bitmap if bits is None else bits & bitmap
+        rows = np.flatnonzero(np.unpackbits(bits, count=self.size)) if bits is not None else None
+        if search:
+            matches = self._search(search.lower())
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        return np.arange(self.size) if rows is None else rows
+
+    def listing(self, **filters):
+        """JSON array of the matching providers, joined from pre-encoded rows"""
+        payloads = self.payloads
+        return '[' + ','.join([payloads[row] for row in self.select(**filters).tolist()]) + ']'
+
+    def nbytes(self):
+        """Approximate memory held by this snapshot"""
+        strings = sys.getsizeof(self.payloads) + sum(sys.getsizeof(payload) for payload in self.payloads)
+        arrays = (self.ids.nbytes + self.category_codes.nbytes + self.region_codes.nbytes
+                  + sys.getsizeof(self.offsets)
+                  + sum(bitmap.nbytes for bitmap in self.category_bitmaps.values())
+                  + sum(bitmap.nbytes for bitmap in self.region_bitmaps.values()))
+        return strings + sys.getsizeof(self.haystack) + arrays
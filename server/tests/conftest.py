@@ -0,0 +1,49 @@
+# Standard library imports
+import os
+import sys
+import tempfile
+
+# Remote library imports
+import pytest
+
+# The app is configured from the environment at import: point it at a
+# throwaway database before anything imports config
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='konekte-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+os.environ['ADMISSION_ENABLED'] = '0'
+
+# Local imports
+from app import app as flask_app  # noqa: E402
+from config import db  # noqa: E402
+from models import User, ServiceProvider  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def provider(app):
+    """A user and one of their service providers, as (user_id, provider_id)"""
+    with app.app_context():
+        user = User(name='Test User', email=f'test-{os.urandom(4).hex()}@konekte.ht')
+        db.session.add(user)
+        db.session.flush()
+        service = ServiceProvider(
+            name='Test Clinic', category='Medical/Health', description='A clinic used by the tests',
+            location='Port-au-Prince', user_id=user.id,
+        )
+        db.session.add(service)
+        db.session.commit()
+        return user.id, service.id
@@ -0,0 +1,48 @@
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from config import admission
+
+
+@pytest.fixture
+def admitting(monkeypatch):
+    monkeypatch.setattr(admission, 'enabled', True)
+    monkeypatch.setattr(admission.rate_limiter, 'buckets', admission.rate_limiter.buckets.__class__())
+    return admission
+
+
+def get(client, path, ip='10.0.0.1'):
+    return client.get(path, buffered=False, environ_base={'REMOTE_ADDR': ip})
+
+
+def test_exports_are_limited_while_they_stream(admitting, client):
+    running = [get(client, '/api/export/reviews', ip) for ip in ('10.0.0.1', '10.0.0.2')]
+    assert [response.status_code for response in running] == [200, 200]
+    busy = get(client, '/api/export/reviews', '10.0.0.3')
+    assert busy.status_code == 503
+    assert busy.headers['Retry-After'] == '60'
+
+    # Finishing a stream frees its slot
+    running[0].close()
+    assert get(client, '/api/export/reviews', '10.0.0.3').status_code == 200
+    running[1].close()
+
+
+def test_exports_have_their_own_rate_limit(admitting, client):
+    statuses = []
+    for _ in range(4):
+        response = get(client, '/api/export/users')
+        statuses.append(response.status_code)
+        response.close()
+    assert statuses == [200, 200, 200, 429]
+    # Other reads from the same client are unaffected
+    assert get(client, '/api/users/1/summary').status_code != 429
+
+
+def test_forwarded_clients_get_their_own_buckets(admitting, app, client, monkeypatch):
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+    for ip in ('203.0.113.7', '203.0.113.8'):
+        response = client.get('/api/export/users', headers={'X-Forwarded-For': ip}, buffered=False)
+        response.close()
+    clients = {client_ip for client_ip, endpoint_class in admission.rate_limiter.buckets}
+    assert clients == {'203.0.113.7', '203.0.113.8'}
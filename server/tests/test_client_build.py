@@ -0,0 +1,26 @@
+import pytest
+
+from client_build import send_build_file, IMMUTABLE
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / 'main.js').write_text('console.log("plain")')
+    (tmp_path / 'main.js.br').write_bytes(b'brotli')
+    (tmp_path / 'main.js.gz').write_bytes(b'gzip')
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('br, gzip', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('identity', None),
+])
+def test_precompressed_variant_follows_accept_encoding(app, build, accept, encoding):
+    with app.test_request_context(headers={'Accept-Encoding': accept}):
+        response = send_build_file(build, 'main.js', IMMUTABLE)
+        assert response.headers.get('Content-Encoding') == encoding
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        response.close()
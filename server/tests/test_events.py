@@ -0,0 +1,116 @@
+import threading
+import time
+
+from config import db
+from events import EventBroker
+from models import EventLog
+
+
+def frames(stream, count):
+    return [next(stream) for _ in range(count)]
+
+
+def test_replays_after_last_event_id():
+    broker = EventBroker()
+    for n in range(3):
+        broker.publish('review.created', {'id': n}, 1)
+    stream = broker.subscribe(last_id=1)
+    retry, second, third = frames(stream, 3)
+    assert retry.startswith('retry:')
+    assert second.startswith('id: 2\n') and third.startswith('id: 3\n')
+
+
+def test_unknown_future_id_resets_and_resumes():
+    broker = EventBroker()
+    broker.publish('review.created', {'id': 1}, 1)
+    stream = broker.subscribe(last_id=500)
+    assert frames(stream, 2)[1].startswith('event: reset')
+    broker.publish('review.created', {'id': 2}, 1)
+    assert next(stream).startswith('id: 2\n')
+
+
+def test_event_published_after_the_first_frame_is_sent():
+    broker = EventBroker()
+    broker.publish('review.created', {'id': 1}, 1)
+    stream = broker.subscribe()
+    next(stream)
+    broker.publish('review.created', {'id': 2}, 1)
+    assert next(stream).startswith('id: 2\n')
+
+
+def test_fell_out_of_buffer_resets():
+    broker = EventBroker(buffer_size=5)
+    for n in range(10):
+        broker.publish('review.created', {'id': n}, 1)
+    stream = broker.subscribe(last_id=2)
+    retry, reset, first = frames(stream, 3)
+    assert reset.startswith('event: reset')
+    assert first.startswith('id: 6\n')
+
+
+def test_filtered_stream_skips_other_providers():
+    broker = EventBroker(buffer_size=5)
+    stream = broker.subscribe(last_id=0, service_provider_id=1)
+    next(stream)
+    # Other providers' events push everything out of the buffer: not a reset for this filter
+    for n in range(20):
+        broker.publish('review.created', {'id': n}, 2)
+    broker.publish('review.created', {'id': 'mine'}, 1)
+    assert next(stream).startswith('id: 21\n')
+
+
+def test_filtered_stream_resets_when_its_events_were_lost():
+    broker = EventBroker(buffer_size=5)
+    broker.publish('review.created', {'id': 0}, 1)
+    for n in range(10):
+        broker.publish('review.created', {'id': n}, 2)
+    stream = broker.subscribe(last_id=0, service_provider_id=1)
+    assert frames(stream, 2)[1].startswith('event: reset')
+
+
+def test_publish_wakes_only_matching_filters():
+    broker = EventBroker()
+    woken = {}
+
+    def waiter(provider_id):
+        woken[provider_id] = broker.wait(0, 1.0, provider_id)
+
+    threads = [threading.Thread(target=waiter, args=(provider_id,)) for provider_id in (1, 2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    broker.publish('review.created', {'id': 1}, 1)
+    for thread in threads:
+        thread.join()
+    assert woken == {1: True, 2: False}
+    assert broker.conditions == {}
+
+
+def test_shared_log_delivers_between_brokers(app):
+    # Two brokers on one database stand in for two worker processes
+    first, second = EventBroker(app, db, EventLog), EventBroker(app, db, EventLog)
+    stream = second.subscribe(service_provider_id=99)
+    next(stream)
+    with app.app_context():
+        event_id = first.publish('review.created', {'id': 'shared'}, 99)
+        assert db.session.get(EventLog, event_id).service_provider_id == 99
+    frame = next(stream)
+    assert frame.startswith(f'id: {event_id}\n') and '"shared"' in frame
+
+
+def test_invalid_last_event_id(client):
+    response = client.get('/api/events', headers={'Last-Event-ID': 'abc'})
+    assert response.status_code == 400
+
+
+def test_write_is_streamed(client, provider):
+    user_id, provider_id = provider
+    response = client.get(f'/api/events?service_provider_id={provider_id}', buffered=False)
+    stream = iter(response.response)
+    next(stream)
+    client.post('/api/reviews', json={
+        'rating': 5, 'comment': 'Open late and helpful', 'user_id': user_id, 'service_provider_id': provider_id,
+    })
+    frame = next(stream).decode()
+    assert 'event: review.created' in frame and 'Open late and helpful' in frame
+    response.close()
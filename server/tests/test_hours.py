@@ -0,0 +1,52 @@
+import pytest
+
+from hours import parse_hours
+
+WEEKDAYS = range(5)
+EVERY_DAY = range(7)
+
+
+def week(days, opens, closes):
+    return [(day, opens, closes) for day in days]
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Seed data
+    ("24/7 - Urgences disponibles", week(EVERY_DAY, 0, 1440)),
+    ("Lundi-Vendredi: 7h-17h, Samedi: 8h-14h", week(WEEKDAYS, 420, 1020) + [(5, 480, 840)]),
+    ("Lundi-Samedi: 8h-19h, Dimanche: 9h-13h", week(range(6), 480, 1140) + [(6, 540, 780)]),
+    ("Tous les jours: 6h-18h", week(EVERY_DAY, 360, 1080)),
+    ("Lundi-Dimanche: 8h-22h (sur réservation)", week(EVERY_DAY, 480, 1320)),
+    ("Dimanche: 9h-13h, Mercredi: 18h-20h, Activités quotidiennes", [(2, 1080, 1200), (6, 540, 780)]),
+    # Kreyòl
+    ("Lendi-Vandredi 8h-16h, samdi 9h-12h", week(WEEKDAYS, 480, 960) + [(5, 540, 720)]),
+    ("Chak jou 7h jiska 15h", week(EVERY_DAY, 420, 900)),
+    ("Lendi-Samdi 8h-17h, femen dimanch", week(range(6), 480, 1020)),
+    ("8h-16h sof madi", [(day, 480, 960) for day in EVERY_DAY if day != 1]),
+    # Past midnight
+    ("Vendredi-Samedi: 20h-2h", [(4, 1200, 1440), (5, 0, 120), (5, 1200, 1440), (6, 0, 120)]),
+    ("Samedi 22h-0h", [(5, 1320, 1440)]),
+    # 24/7
+    ("24h/24", week(EVERY_DAY, 0, 1440)),
+    ("24/7 sauf dimanche", week(range(6), 0, 1440)),
+    # Half hours
+    ("Lundi-Vendredi 8h30-12h, 14h-17h30", sorted(week(WEEKDAYS, 510, 720) + week(WEEKDAYS, 840, 1050))),
+    ("Samedi: 9:15 - 11:45", [(5, 555, 705)]),
+    # Exceptions and closed days
+    ("7h à 19h sauf dimanche", week(range(6), 420, 1140)),
+    ("Lundi-Samedi sauf mercredi: 8h-17h", [(day, 480, 1020) for day in range(6) if day != 2]),
+    ("Lundi-Samedi: 8h-17h, Samedi: fermé", week(WEEKDAYS, 480, 1020)),
+    ("Fermé le dimanche, 8h-16h", week(range(6), 480, 960)),
+    ("Samedi fermé, dimanche 8h-12h", [(6, 480, 720)]),
+    ("Lundi-Samedi: 20h-2h sauf mercredi",
+     sorted([(day, 1200, 1440) for day in range(6) if day != 2] + [(day, 0, 120) for day in (1, 2, 4, 5, 6)])),
+    ("Lundi-Vendredi 8h-17h, fermé de 12h à 13h", sorted(week(WEEKDAYS, 480, 720) + week(WEEKDAYS, 780, 1020))),
+    ("8h-17h sauf 12h-13h", sorted(week(EVERY_DAY, 480, 720) + week(EVERY_DAY, 780, 1020))),
+    # Nothing that can be trusted
+    ("Fermé pour travaux", []),
+    ("Sur rendez-vous", []),
+    ("", []),
+    (None, []),
+])
+def test_parse_hours(text, expected):
+    assert parse_hours(text) == expected
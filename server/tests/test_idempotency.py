@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from app import idempotency
+from config import db
+from models import IdempotencyKey, Review
+
+
+def review_body(provider, comment='Retried until it worked'):
+    user_id, provider_id = provider
+    return json.dumps({'rating': 4, 'comment': comment, 'user_id': user_id, 'service_provider_id': provider_id})
+
+
+def post(client, body, key, ip='127.0.0.1'):
+    return client.post(
+        '/api/reviews', data=body, content_type='application/json', headers={'Idempotency-Key': key},
+        environ_base={'REMOTE_ADDR': ip},
+    )
+
+
+def claim(app, key, body, age):
+    """An in-progress claim, as left by a worker that is still running or died"""
+    fingerprint = hashlib.sha256(b'POST /api/reviews\n' + body.encode()).hexdigest()
+    with app.app_context():
+        db.session.add(IdempotencyKey(
+            key=idempotency.scoped_key(key, '127.0.0.1'), fingerprint=fingerprint, created_at=datetime.utcnow() - age,
+        ))
+        db.session.commit()
+
+
+def count_reviews(app, comment):
+    with app.app_context():
+        return db.session.query(Review).filter_by(comment=comment).count()
+
+
+def test_parallel_retries_create_once(app, provider):
+    key, comment = str(uuid.uuid4()), f'Parallel retry {uuid.uuid4()}'
+    body = review_body(provider, comment)
+    responses = []
+    start = threading.Barrier(20)
+
+    def client():
+        test_client = app.test_client()
+        start.wait()
+        responses.append(post(test_client, body, key))
+
+    threads = [threading.Thread(target=client) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert count_reviews(app, comment) == 1
+    with app.app_context():
+        assert db.session.query(IdempotencyKey).filter_by(key=idempotency.scoped_key(key, '127.0.0.1')).count() == 1
+    assert [response.status_code for response in responses] == [201] * 20
+    replayed = [response for response in responses if response.headers.get('Idempotent-Replayed') == 'true']
+    assert len(replayed) == 19
+    assert len({response.json['id'] for response in responses}) == 1
+
+
+def test_reused_key_with_other_body(client, provider):
+    key = str(uuid.uuid4())
+    assert post(client, review_body(provider, 'First request body'), key).status_code == 201
+    assert post(client, review_body(provider, 'Second request body'), key).status_code == 422
+
+
+def test_in_progress_key_is_busy(app, client, provider, monkeypatch):
+    monkeypatch.setattr(idempotency, 'wait', 0.1)
+    key, body = str(uuid.uuid4()), review_body(provider)
+    claim(app, key, body, timedelta(seconds=1))
+    response = post(client, body, key)
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_abandoned_key_is_taken_over(app, client, provider):
+    key, comment = str(uuid.uuid4()), f'Worker died {uuid.uuid4()}'
+    body = review_body(provider, comment)
+    claim(app, key, body, timedelta(seconds=idempotency.lock_timeout + 5))
+    response = post(client, body, key)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert post(client, body, key).headers['Idempotent-Replayed'] == 'true'
+    assert count_reviews(app, comment) == 1
+
+
+def test_keys_are_scoped_per_client(app, client, provider):
+    key, comment = str(uuid.uuid4()), f'Same key, two phones {uuid.uuid4()}'
+    body = review_body(provider, comment)
+    first, second = post(client, body, key, '10.0.0.1'), post(client, body, key, '10.0.0.2')
+    assert [first.status_code, second.status_code] == [201, 201]
+    assert 'Idempotent-Replayed' not in second.headers
+    assert first.json['id'] != second.json['id']
+    assert count_reviews(app, comment) == 2
+
+
+def test_transient_failure_is_not_replayed(app, client, provider, monkeypatch):
+    key, comment = str(uuid.uuid4()), f'Database was locked {uuid.uuid4()}'
+    body = review_body(provider, comment)
+
+    def locked():
+        raise OperationalError('INSERT', {}, Exception('database is locked'))
+
+    with monkeypatch.context() as patched:
+        patched.setattr(db.session, 'commit', locked)
+        assert post(client, body, key).status_code == 503
+    response = post(client, body, key)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert count_reviews(app, comment) == 1
@@ -0,0 +1,53 @@
+import json
+import uuid
+from argparse import Namespace
+
+from config import db
+from jobs import import_records
+from models import User, Review
+
+
+def write_ndjson(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+def test_import_rejects_only_rows_that_violate_constraints(app, provider, tmp_path, capsys):
+    user_id, provider_id = provider
+    with app.app_context():
+        taken = db.session.get(User, user_id).email
+    suffix = uuid.uuid4().hex[:8]
+    users = [
+        {'name': 'First Import', 'email': f'first-{suffix}@konekte.ht'},
+        {'name': 'Duplicate Email', 'email': taken},
+        {'name': 'X', 'email': 'not-an-email'},
+        {'name': 'Last Import', 'email': f'last-{suffix}@konekte.ht'},
+    ]
+    import_records(Namespace(resource='users', path=write_ndjson(tmp_path / 'users.ndjson', users),
+                             batch_size=10, keep_ids=False))
+
+    output = capsys.readouterr().out
+    assert 'line 2: UNIQUE constraint failed: users.email' in output
+    assert 'line 3:' in output
+    assert 'Imported 2 users, rejected 2' in output
+    with app.app_context():
+        assert db.session.query(User).filter(User.email.like(f'%-{suffix}@konekte.ht')).count() == 2
+
+
+def test_import_continues_after_a_failed_batch(app, provider, tmp_path, capsys):
+    user_id, provider_id = provider
+    reviews = [
+        {'rating': 5, 'comment': f'Imported review {n}', 'user_id': user_id, 'service_provider_id': provider_id}
+        for n in range(5)
+    ]
+    reviews[1]['service_provider_id'] = 999999
+    import_records(Namespace(resource='reviews', path=write_ndjson(tmp_path / 'reviews.ndjson', reviews),
+                             batch_size=2, keep_ids=False))
+
+    output = capsys.readouterr().out
+    assert 'line 2: FOREIGN KEY constraint failed' in output
+    assert 'Imported 4 reviews, rejected 1' in output
+    with app.app_context():
+        assert db.session.query(Review).filter(
+            Review.service_provider_id == provider_id, Review.comment.like('Imported review %')
+        ).count() == 4
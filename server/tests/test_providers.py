@@ -0,0 +1,93 @@
+import pytest
+
+from config import db
+from models import ServiceProvider, ServiceHours, Review, SimilarProvider, UserRecommendation
+
+
+@pytest.fixture
+def linked(app, client, provider):
+    """A provider with hours and a review, listed as similar to and recommended with a second one"""
+    user_id, other_id = provider
+    response = client.post('/api/service-providers', json={
+        'name': 'Lekol Lakay', 'category': 'Education', 'description': 'A school used by the tests',
+        'location': 'Cap-Haitien', 'region': 'Nord', 'hours': 'Lundi-Vendredi: 7h-15h', 'user_id': user_id,
+    })
+    assert response.status_code == 201
+    service_id = response.json['id']
+    assert client.post('/api/reviews', json={
+        'rating': 4, 'comment': 'Good teachers', 'user_id': user_id, 'service_provider_id': service_id,
+    }).status_code == 201
+    with app.app_context():
+        db.session.add_all([
+            SimilarProvider(service_provider_id=service_id, rank=1, similar_id=other_id, score=0.9),
+            SimilarProvider(service_provider_id=other_id, rank=1, similar_id=service_id, score=0.9),
+            UserRecommendation(user_id=user_id, rank=1, service_provider_id=service_id, score=0.8),
+        ])
+        db.session.commit()
+    return user_id, service_id, other_id
+
+
+def count(model, *conditions):
+    return db.session.query(model).filter(*conditions).count()
+
+
+def ids(response):
+    assert response.status_code == 200
+    return [row['id'] for row in response.json]
+
+
+def test_foreign_keys_are_enforced(app):
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA foreign_keys')).scalar() == 1
+
+
+def test_delete_cascades_in_the_database(app, client, linked):
+    user_id, service_id, other_id = linked
+    with app.app_context():
+        assert count(ServiceHours, ServiceHours.service_provider_id == service_id) == 5
+    assert client.delete(f'/api/service-providers/{service_id}').status_code == 200
+
+    with app.app_context():
+        assert count(ServiceProvider, ServiceProvider.id == service_id) == 0
+        assert count(Review, Review.service_provider_id == service_id) == 0
+        assert count(ServiceHours, ServiceHours.service_provider_id == service_id) == 0
+        # Both directions: its own list, and its place in other providers' lists
+        assert count(SimilarProvider, SimilarProvider.service_provider_id == service_id) == 0
+        assert count(SimilarProvider, SimilarProvider.similar_id == service_id) == 0
+        assert count(UserRecommendation, UserRecommendation.service_provider_id == service_id) == 0
+    assert client.get(f'/api/service-providers/{other_id}/similar').json == []
+
+
+def test_plain_sql_delete_cascades(app, linked):
+    # No ORM relationships involved: only ON DELETE CASCADE can remove these
+    _, service_id, _ = linked
+    with app.app_context():
+        db.session.execute(db.delete(ServiceProvider).where(ServiceProvider.id == service_id))
+        db.session.commit()
+        assert count(Review, Review.service_provider_id == service_id) == 0
+        assert count(ServiceHours, ServiceHours.service_provider_id == service_id) == 0
+        assert count(SimilarProvider, SimilarProvider.similar_id == service_id) == 0
+
+
+def test_archive_hides_and_unarchive_restores(app, client, linked):
+    user_id, service_id, other_id = linked
+    similar, recommendations = f'/api/service-providers/{other_id}/similar', f'/api/users/{user_id}/recommendations'
+    assert service_id in ids(client.get('/api/service-providers'))
+    assert ids(client.get(similar)) == [service_id]
+    assert ids(client.get(recommendations)) == [service_id]
+
+    assert client.delete(f'/api/service-providers/{service_id}?archive=1').status_code == 200
+    assert service_id not in ids(client.get('/api/service-providers'))
+    assert client.get(f'/api/service-providers/{service_id}').status_code == 404
+    assert client.get(f'/api/service-providers/{service_id}/similar').status_code == 404
+    assert ids(client.get(similar)) == []
+    assert ids(client.get(recommendations)) == []
+    # Archiving keeps the provider and its reviews
+    with app.app_context():
+        assert count(Review, Review.service_provider_id == service_id) == 1
+
+    response = client.patch(f'/api/service-providers/{service_id}', json={'archived': False})
+    assert response.status_code == 200
+    assert service_id in ids(client.get('/api/service-providers'))
+    assert ids(client.get(similar)) == [service_id]
+    assert ids(client.get(recommendations)) == [service_id]
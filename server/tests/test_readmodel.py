@@ -0,0 +1,117 @@
+import uuid
+
+import pytest
+
+from app import read_model
+from config import db, events
+from events import EventBroker
+from models import EventLog, ServiceProvider
+
+
+QUERIES = [
+    '',
+    'category=Education',
+    'category=Unknown',
+    'region=Nord',
+    'category=Medical/Health&region=Ouest',
+    'search=ecole',
+    'search=PORT-AU',
+    'search=nothing matches this',
+    'category=Education&search=lakay&region=Nord',
+]
+
+
+@pytest.fixture
+def memory(app, provider, monkeypatch):
+    """The read model, loaded and following events as with READ_MODEL=1"""
+    monkeypatch.setattr(read_model, 'snapshot', None)
+    monkeypatch.setattr(events, 'followers', [read_model.on_event])
+    with app.app_context():
+        read_model.rebuild()
+    return read_model
+
+
+@pytest.fixture
+def services(client, provider):
+    user_id, _ = provider
+    tag = uuid.uuid4().hex[:8]
+    ids = []
+    for name, category, region, location in [
+        (f'Lakay Ecole {tag}', 'Education', 'Nord', 'Cap-Haitien'),
+        (f'Klinik {tag}', 'Medical/Health', 'Ouest', 'Port-au-Prince'),
+        (f'Dlo Pwop {tag}', 'Water & Sanitation', 'Sud', 'Les Cayes'),
+    ]:
+        response = client.post('/api/service-providers', json={
+            'name': name, 'category': category, 'region': region, 'location': location,
+            'description': f'Community service for {location}', 'user_id': user_id,
+        })
+        assert response.status_code == 201
+        ids.append(response.json['id'])
+    return ids
+
+
+def listings(client, memory, query):
+    """(SQL listing, read model listing) for one query string"""
+    results = []
+    for enabled in (False, True):
+        memory.enabled = enabled
+        try:
+            response = client.get(f'/api/service-providers?{query}')
+        finally:
+            memory.enabled = False
+        assert response.status_code == 200
+        results.append(response.json)
+    return results
+
+
+def assert_same(client, memory):
+    for query in QUERIES:
+        sql, in_memory = listings(client, memory, query)
+        assert sql == in_memory, query
+
+
+def test_filters_match_sql(client, memory, services):
+    assert_same(client, memory)
+    sql, _ = listings(client, memory, 'search=ecole')
+    assert services[0] in [service['id'] for service in sql]
+
+
+def test_archived_providers_are_hidden_and_restored(client, memory, services):
+    service_id = services[1]
+    assert client.delete(f'/api/service-providers/{service_id}?archive=1').status_code == 200
+    sql, in_memory = listings(client, memory, '')
+    assert sql == in_memory
+    assert service_id not in [service['id'] for service in in_memory]
+
+    assert client.patch(f'/api/service-providers/{service_id}', json={'archived': False}).status_code == 200
+    sql, in_memory = listings(client, memory, '')
+    assert sql == in_memory
+    assert service_id in [service['id'] for service in in_memory]
+
+
+def test_patch_after_write(client, memory, services):
+    service_id, tag = services[2], uuid.uuid4().hex[:8]
+    response = client.patch(f'/api/service-providers/{service_id}', json={
+        'name': f'Dlo Pwop Lekol {tag}', 'category': 'Education', 'region': 'Nord',
+    })
+    assert response.status_code == 200
+    assert_same(client, memory)
+    _, in_memory = listings(client, memory, f'category=Education&search=lekol {tag}&region=Nord')
+    assert [service['id'] for service in in_memory] == [service_id]
+
+    assert client.delete(f'/api/service-providers/{service_id}').status_code == 200
+    assert_same(client, memory)
+
+
+def test_follows_writes_from_other_workers(app, client, memory, services):
+    service_id = services[0]
+    # Another worker process: its own broker on the shared event log
+    other = EventBroker(app, db, EventLog)
+    with app.app_context():
+        db.session.get(ServiceProvider, service_id).name = f'Renamed Elsewhere {service_id}'
+        db.session.commit()
+        other.publish('service_provider.updated', {'id': service_id}, service_id)
+        # What this process's poller thread does on its next tick
+        events._poll()
+    _, in_memory = listings(client, memory, f'search=renamed elsewhere {service_id}')
+    assert [service['id'] for service in in_memory] == [service_id]
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from config import db
+from models import ServiceProvider, PendingShardSync, ShardPlacement
+from sharding import ShardRouter
+
+
+@pytest.fixture
+def shards(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'SHARD_URL_TEMPLATE', f'sqlite:///{tmp_path}/{{region}}.db')
+    router = ShardRouter(app)
+    # Drive reconcile() from the tests instead of the background thread
+    monkeypatch.setattr(router, '_start_worker', lambda: None)
+    with app.app_context():
+        yield router
+        db.session.execute(sa.delete(PendingShardSync))
+        db.session.commit()
+
+
+def shard_ids(router, region):
+    with router.engines[region].connect() as connection:
+        return connection.execute(sa.select(router.providers.c.id)).scalars().all()
+
+
+def queued(provider_id):
+    return db.session.execute(
+        sa.select(PendingShardSync).where(PendingShardSync.service_provider_id == provider_id)
+    ).scalars().all()
+
+
+def test_queued_write_is_copied_to_its_shard(shards, provider):
+    _, provider_id = provider
+    shards.enqueue(provider_id)
+    assert len(queued(provider_id)) == 1
+    assert shards.reconcile() == (1, 0)
+    assert provider_id in shard_ids(shards, 'Ouest')
+    assert db.session.get(ShardPlacement, provider_id).region == 'Ouest'
+    assert queued(provider_id) == []
+
+
+def test_region_change_touches_two_shards(shards, provider):
+    _, provider_id = provider
+    shards.enqueue(provider_id)
+    shards.reconcile()
+
+    db.session.get(ServiceProvider, provider_id).region = 'Nord'
+    db.session.commit()
+    transactions = []
+    for region, engine in shards.engines.items():
+        sa.event.listen(engine, 'begin', lambda connection, region=region: transactions.append(region))
+    shards.enqueue(provider_id)
+    shards.reconcile()
+
+    assert sorted(transactions) == ['Nord', 'Ouest']
+    assert provider_id in shard_ids(shards, 'Nord')
+    assert provider_id not in shard_ids(shards, 'Ouest')
+
+
+def test_failed_sync_is_retried(shards, provider):
+    _, provider_id = provider
+    working = shards.engines['Ouest']
+    shards.engines['Ouest'] = sa.create_engine('sqlite:////nonexistent/ouest.db')
+    shards.enqueue(provider_id)
+    shards.enqueue(provider_id)
+    assert shards.reconcile() == (0, 1)
+    entries = queued(provider_id)
+    assert [entry.attempts for entry in entries] == [1, 1]
+    assert 'unable to open database' in entries[0].last_error
+    assert entries[0].claimed_until is None
+    assert entries[0].available_at > datetime.utcnow()
+    # Backing off: nothing is due yet
+    assert shards.reconcile() == (0, 0)
+
+    shards.engines['Ouest'] = working
+    db.session.execute(sa.update(PendingShardSync).values(available_at=datetime.utcnow()))
+    db.session.commit()
+    assert shards.reconcile() == (1, 0)
+    assert queued(provider_id) == []
+    assert provider_id in shard_ids(shards, 'Ouest')
+
+
+def test_provider_claimed_by_another_worker_is_skipped(shards, provider):
+    _, provider_id = provider
+    shards.enqueue(provider_id)
+    # Another worker holds this provider while it copies
+    assert len(shards._claim(provider_id)) == 1
+    shards.enqueue(provider_id)
+    assert shards._claim(provider_id) == []
+    assert shards.reconcile() == (0, 0)
+    assert provider_id not in shard_ids(shards, 'Ouest')
+
+
+def test_expired_claim_is_taken_over(shards, provider):
+    _, provider_id = provider
+    shards.enqueue(provider_id)
+    shards._claim(provider_id)
+    # Its worker died mid-copy: the lease runs out
+    db.session.execute(sa.update(PendingShardSync).values(claimed_until=datetime.utcnow()))
+    db.session.commit()
+    assert shards.reconcile() == (1, 0)
+    assert queued(provider_id) == []
+    assert provider_id in shard_ids(shards, 'Ouest')
+
+
+def test_write_queued_during_a_copy_waits_for_the_next_round(shards, provider, monkeypatch):
+    _, provider_id = provider
+    shards.enqueue(provider_id)
+    copy = shards.sync_provider
+
+    def sync_provider(provider_id):
+        # A region change committed while this copy runs
+        db.session.get(ServiceProvider, provider_id).region = 'Nord'
+        db.session.commit()
+        shards.enqueue(provider_id)
+        copy(provider_id)
+
+    monkeypatch.setattr(shards, 'sync_provider', sync_provider)
+    assert shards.reconcile() == (1, 0)
+    assert len(queued(provider_id)) == 1
+    monkeypatch.setattr(shards, 'sync_provider', copy)
+    assert shards.reconcile() == (1, 0)
+    assert queued(provider_id) == []
+    assert provider_id in shard_ids(shards, 'Nord')
+    assert db.session.get(ShardPlacement, provider_id).region == 'Nord'
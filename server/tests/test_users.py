@@ -0,0 +1,100 @@
+import uuid
+
+import pytest
+
+from config import db
+from models import Review, ServiceProvider
+
+
+@pytest.fixture
+def user(client):
+    response = client.post('/api/users', json={'name': 'Paged User', 'email': f'{uuid.uuid4().hex}@konekte.ht'})
+    assert response.status_code == 201
+    return response.json['id']
+
+
+@pytest.fixture
+def reviews(app, user, provider):
+    """120 reviews by user, ratings cycling 1-5; returns their ids, newest first"""
+    _, provider_id = provider
+    with app.app_context():
+        db.session.execute(db.insert(Review), [
+            {'rating': n % 5 + 1, 'comment': f'Review number {n}', 'user_id': user, 'service_provider_id': provider_id}
+            for n in range(120)
+        ])
+        db.session.commit()
+        return db.session.execute(
+            db.select(Review.id).where(Review.user_id == user).order_by(Review.id.desc())
+        ).scalars().all()
+
+
+def add_services(app, user, count):
+    with app.app_context():
+        services = [
+            ServiceProvider(
+                name=f'Service {n}', category='Education', description='A service used by the tests',
+                location='Port-au-Prince', user_id=user,
+            )
+            for n in range(count)
+        ]
+        db.session.add_all(services)
+        db.session.commit()
+        return [service.id for service in services]
+
+
+def ids(response):
+    assert response.status_code == 200
+    return [row['id'] for row in response.json]
+
+
+def test_summary_of_user_with_no_rows(client, user):
+    assert client.get(f'/api/users/{user}/summary').json == {
+        'id': user, 'name': 'Paged User', 'review_count': 0, 'average_rating': None,
+        'service_count': 0, 'last_review_at': None, 'last_service_at': None,
+    }
+
+
+def test_summary_counts_reviews_and_listed_services(app, client, user, reviews):
+    first, second, archived = add_services(app, user, 3)
+    assert client.delete(f'/api/service-providers/{archived}?archive=1').status_code == 200
+    summary = client.get(f'/api/users/{user}/summary').json
+    assert summary['review_count'] == 120
+    assert summary['average_rating'] == 3.0
+    assert summary['service_count'] == 2
+    assert summary['last_review_at'] is not None and summary['last_service_at'] is not None
+
+
+@pytest.mark.parametrize('resource', ['summary', 'reviews', 'services'])
+def test_unknown_user(client, resource):
+    response = client.get(f'/api/users/999999/{resource}')
+    assert response.status_code == 404
+    assert response.json == {'error': 'User not found'}
+
+
+def test_reviews_are_paged_newest_first(client, user, reviews):
+    path = f'/api/users/{user}/reviews'
+    assert ids(client.get(path)) == reviews[:20]
+    assert ids(client.get(f'{path}?limit=5&before={reviews[4]}')) == reviews[5:10]
+    # Walking every page with before= visits each review once
+    seen, before = [], None
+    while True:
+        page = ids(client.get(f'{path}?limit=50' + (f'&before={before}' if before else '')))
+        if not page:
+            break
+        seen += page
+        before = page[-1]
+    assert seen == reviews
+
+
+@pytest.mark.parametrize('limit, size', [('0', 1), ('-3', 1), ('1000', 100), ('abc', 20)])
+def test_limit_is_clamped(client, user, reviews, limit, size):
+    assert len(ids(client.get(f'/api/users/{user}/reviews?limit={limit}'))) == size
+
+
+def test_services_page_skips_archived(app, client, user):
+    services = add_services(app, user, 4)
+    assert client.delete(f'/api/service-providers/{services[2]}?archive=1').status_code == 200
+    path = f'/api/users/{user}/services'
+    assert ids(client.get(path)) == [services[3], services[1], services[0]]
+    assert ids(client.get(f'{path}?limit=1&before={services[3]}')) == [services[1]]
+    assert ids(client.get(f'{path}?before={services[0]}')) == []
@@ -0,0 +1,23 @@
+import pytest
+
+from validation import REVIEW_SCHEMA
+
+
+@pytest.mark.parametrize('field', ['rating', 'user_id', 'service_provider_id'])
+def test_review_rejects_bools_for_integer_fields(client, provider, field):
+    user_id, provider_id = provider
+    body = {'rating': 4, 'comment': 'Checked by type', 'user_id': user_id, 'service_provider_id': provider_id}
+    body[field] = True
+    assert client.post('/api/reviews', json=body).status_code == 400
+
+
+@pytest.mark.parametrize('value', [True, False, 4.0, '4'])
+def test_rating_must_be_a_plain_integer(value):
+    with pytest.raises(ValueError):
+        REVIEW_SCHEMA.check('rating', value)
+
+
+def test_rating_range():
+    assert REVIEW_SCHEMA.check('rating', 5) == 5
+    with pytest.raises(ValueError, match='between 1 and 5'):
+        REVIEW_SCHEMA.check('rating', 6)
@@ -0,0 +1,212 @@
+CATEGORIES = [
+    'Medical/Health',
+    'Education',
+    'Water & Sanitation',
+    'Community Centers',
+    'Emergency Services',
+]
+
+# Haiti's ten départements, the key for regional shards
+REGIONS = [
+    'Artibonite', 'Centre', "Grand'Anse", 'Nippes', 'Nord',
+    'Nord-Est', 'Nord-Ouest', 'Ouest', 'Sud', 'Sud-Est',
+]
+
+
+class ValidationError(ValueError):
+    """Every invalid field of one record, as errors = {field: message}"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors.values()))
+        self.errors = errors
+
+
+# Field rules: each returns check(value), which returns the cleaned value or
+# raises ValueError. Messages are built once, not on every call.
+
+def text(label, min_length, max_length):
+    too_short = f"{label} must be at least {min_length} characters long"
+    too_long = f"{label} must be less than {max_length} characters"
+
+    def check(value):
+        if not isinstance(value, str) or len(value.strip()) < min_length:
+            raise ValueError(too_short)
+        if len(value) > max_length:
+            raise ValueError(too_long)
+        return value.strip()
+    return check
+
+
+def optional_text(label, max_length):
+    not_text = f"{label} must be text"
+    too_long = f"{label} must be less than {max_length} characters"
+
+    def check(value):
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            raise ValueError(not_text)
+        if len(value) > max_length:
+            raise ValueError(too_long)
+        return value
+    return check
+
+
+def email(max_length=120):
+    invalid = "Must provide a valid email address"
+    too_long = f"Email must be less than {max_length} characters"
+
+    def check(value):
+        if not isinstance(value, str) or '@' not in value:
+            raise ValueError(invalid)
+        if len(value) > max_length:
+            raise ValueError(too_long)
+        return value.lower().strip()
+    return check
+
+
+def choice(label, choices):
+    allowed = frozenset(choices)
+    invalid = f"{label} must be one of: {', '.join(choices)}"
+
+    def check(value):
+        if not isinstance(value, str) or value not in allowed:
+            raise ValueError(invalid)
+        return value
+    return check
+
+
+# Spaces, dashes and parentheses are allowed in phone numbers
+PHONE_PUNCTUATION = str.maketrans('', '', ' -()')
+
+
+def phone(min_digits=8, max_digits=15):
+    not_digits = "Phone number must contain only digits, spaces, dashes, or parentheses"
+    bad_length = f"Phone number must be between {min_digits} and {max_digits} digits"
+
+    def check(value):
+        if value:
+            if not isinstance(value, str):
+                raise ValueError(not_digits)
+            digits = value.translate(PHONE_PUNCTUATION)
+            if not digits.isdigit():
+                raise ValueError(not_digits)
+            if len(digits) < min_digits or len(digits) > max_digits:
+                raise ValueError(bad_length)
+        return value
+    return check
+
+
+def integer(label, low, high):
+    not_integer = f"{label} must be an integer"
+    out_of_range = f"{label} must be between {low} and {high}"
+
+    def check(value):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(not_integer)
+        if value < low or value > high:
+            raise ValueError(out_of_range)
+        return value
+    return check
+
+
+def reference(label):
+    invalid = f"{label} must be given as an integer id"
+
+    def check(value):
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(invalid)
+        return value
+    return check
+
+
+class Schema:
+    """Field rules for one model, compiled once into a validate(record) function.
+
+    It runs on plain dicts, so the API checks payloads before opening a
+    session or building a model, and bulk import checks whole batches
+    without ORM objects. The models' @validates hooks call the same rules.
+    """
+
+    def __init__(self, defaults=None, **fields):
+        self.fields = fields
+        self.defaults = defaults or {}
+        self.validate = self._compile()
+
+    def check(self, name, value):
+        """Validate one field, raising ValueError (used by the ORM @validates hooks)"""
+        return self.fields[name](value)
+
+    def _compile(self):
+        rules = tuple((name, check, self.defaults.get(name)) for name, check in self.fields.items())
+
+        def validate(record, partial=False):
+            """Cleaned copy of record's fields; raises ValidationError listing every bad field.
+
+            With partial=True (PATCH) only the fields present are checked.
+            """
+            if not isinstance(record, dict):
+                raise ValidationError({'body': "Expected a JSON object"})
+            clean = {}
+            errors = None
+            for name, check, default in rules:
+                if name in record:
+                    value = record[name]
+                elif partial:
+                    continue
+                else:
+                    value = default
+                try:
+                    clean[name] = check(value)
+                except ValueError as e:
+                    if errors is None:
+                        errors = {}
+                    errors[name] = str(e)
+            if errors:
+                raise ValidationError(errors)
+            return clean
+        return validate
+
+    def validate_many(self, records, keep=()):
+        """Check a batch: (cleaned valid records, [(index, errors)] for the rest).
+
+        Keys in keep (e.g. 'id' on import) are copied unchanged into valid records.
+        """
+        validate = self.validate
+        valid, invalid = [], []
+        for index, record in enumerate(records):
+            try:
+                clean = validate(record)
+            except ValidationError as e:
+                invalid.append((index, e.errors))
+                continue
+            for key in keep:
+                if key in record:
+                    clean[key] = record[key]
+            valid.append(clean)
+        return valid, invalid
+
+
+USER_SCHEMA = Schema(
+    name=text('Name', 2, 100),
+    email=email(120),
+)
+
+SERVICE_PROVIDER_SCHEMA = Schema(
+    name=text('Service name', 3, 150),
+    category=choice('Category', CATEGORIES),
+    description=text('Description', 10, 1000),
+    location=text('Location', 5, 200),
+    phone=phone(),
+    hours=optional_text('Hours', 100),
+    region=choice('Region', REGIONS),
+    user_id=reference('User'),
+    defaults={'region': 'Ouest'},
+)
+
+REVIEW_SCHEMA = Schema(
+    rating=integer('Rating', 1, 5),
+    comment=text('Comment', 5, 500),
+    user_id=reference('User'),
+    service_provider_id=reference('Service provider'),
+)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import gc
+
+# Remote library imports
+from sqlalchemy.orm import configure_mappers
+
+# Local imports
+from app import app, shards, read_model
+from config import db
+
+
+def _engines():
+    with app.app_context():
+        return [db.engine, *shards.engines.values()]
+
+
+def warm_up():
+    """Build shared state in the gunicorn master, before any worker forks.
+
+    Everything built here is inherited copy-on-write by every worker
+    instead of being rebuilt once per worker.
+    """
+    configure_mappers()
+    with app.app_context():
+        if read_model.enabled:
+            read_model.rebuild()
+    # Children must not share the master's sockets: close them before forking
+    for engine in _engines():
+        engine.dispose()
+    # Keep the collector from touching (and so un-sharing) what was loaded so far
+    gc.freeze()
+
+
+def after_fork():
+    """Forget pooled connections inherited from the master without closing them"""
+    for engine in _engines():
+        engine.dispose(close=False)
+
+
+def prime_worker():
+    """Open a database connection per engine before the worker accepts requests"""
+    for engine in _engines():
+        with engine.connect() as connection:
+            connection.execute(db.text('SELECT 1'))